@@ -2,122 +2,17 @@
 
 import yaml
 import os
+from core.llm import ollama_client
 from core.llm.ollama_client import generate_answer
 from core.answer_retriever import AnswerRetriever  # NEW
+from core.near_dup import NearDuplicateIndex
+from core.embeddings import EmbeddingCache, SemanticRetriever
+# intent / behavior-tag rules live in core/intent.py (one compiled classifier, shared with projects.py)
+from core.intent import classify_intent as classify_question_intent
+from core.intent import classify_behavior_tags as _classify_behavior_tags
 # (projects.yaml is still loaded locally here; project.py can be used elsewhere if you want)
 
 
-def classify_question_intent(q: str) -> str:
-    q = q.lower().strip()
-
-    if any(p in q for p in ["tell me about yourself", "introduce yourself", "who are you"]):
-        return "intro"
-
-    if "what have you studied" in q or "education" in q or "background" in q:
-        return "education"
-
-    if "experience" in q and "what has been your" in q:
-        return "experience"
-
-    if "strength" in q:
-        return "strengths"
-
-    if "weakness" in q or "development areas" in q or "improvement areas" in q:
-        return "weaknesses"
-
-    # LLM basics
-    if any(p in q for p in [
-        "what is an llm",
-        "what is a large language model",
-        "how do llms work",
-        "generative ai",
-        "foundation model",
-        "what is gpt",
-        "what are transformers",
-    ]):
-        return "llm_basics"
-
-    # ML pipeline / productionization
-    if any(p in q for p in [
-        "ml pipeline",
-        "machine learning pipeline",
-        "end to end pipeline",
-        "end-to-end pipeline",
-        "ml workflow",
-        "machine learning workflow",
-        "productionize",
-        "productionalize",
-        "deploy a model",
-        "model deployment steps",
-        "model training pipeline",
-        "feature pipeline",
-    ]):
-        return "ml_pipeline"
-
-    why_patterns = [
-        "why do you want to work here",
-        "why do you want to work for",
-        "why are you interviewing with me today",
-        "why are you interviewing with us",
-        "what made you apply for this job",
-        "what made you apply",
-        "why this job",
-        "why this company",
-        "why do you want to join",
-        "why do you want this role",
-        "why are you interested in this position",
-        "why should we hire you",
-        "why should we give this job to you",
-        "why should we hire you and not someone else",
-    ]
-    if any(p in q for p in why_patterns):
-        return "why_company"
-
-    # Behavioral / STAR-style project questions
-    behavioral_patterns = [
-        "tell me about a time",
-        "give me an example",
-        "describe a time",
-        "describe a situation",
-        "situation where",
-        "project where",
-        "project when",
-        "time when you",
-        "time when you were",
-        "handled a",
-        "faced a",
-        "dealt with",
-        "how did you handle",
-        "how did you meet the deadline",
-        "with a deadline",
-        "in charge of a project",
-    ]
-
-    if any(p in q for p in behavioral_patterns):
-        return "behavioral_project"
-
-    # Generic “tell me about a project” → treat as behavioral_project
-    if "project" in q and any(p in q for p in [
-        "end-to-end",
-        "end to end",
-        "mlops",
-        "devops",
-        "specific project you worked on",
-        "project you worked on",
-        "end-to-end mlops",
-        "end-to-end devops",
-        "devops project",
-        "mlops project",
-        "devops project you worked on",
-        "mlops project you worked on",
-        "devops pipeline you worked on",
-        "mlops pipeline you worked on",
-    ]):
-        return "behavioral_project"
-
-    return "generic"
-
-
 # ---------- Project loader + picker (local copy, fine for now) ----------
 
 def _load_projects_from_yaml(path: str):
@@ -133,59 +28,6 @@ def _load_projects_from_yaml(path: str):
         return []
 
 
-def _classify_behavior_tags(question: str):
-    q = question.lower()
-    tags = []
-
-    # DEADLINE / PRESSURE / OWNERSHIP
-    if any(w in q for w in ["deadline", "time pressure", "tight schedule", "deliver on time"]):
-        tags.append("deadline")
-    if any(w in q for w in ["in charge", "led", "leadership", "owned", "owner", "drove"]):
-        tags.append("leadership")
-        tags.append("ownership")
-
-    # COST / OPTIMIZATION / EFFICIENCY
-    if any(w in q for w in ["cost", "budget", "optimiz", "expense", "saving", "save money"]):
-        tags.append("cost")
-        tags.append("analysis")
-
-    # RELIABILITY / INCIDENT / DR
-    if any(w in q for w in ["incident", "outage", "downtime", "reliability", "dr", "disaster"]):
-        tags.append("incident")
-        tags.append("reliability")
-        tags.append("risk")
-
-    # COMPLIANCE / SECURITY
-    if any(w in q for w in ["compliance", "audit", "soc2", "security", "controls", "governance"]):
-        tags.append("compliance")
-        tags.append("audit")
-        tags.append("security")
-
-    # MLOps / DATA / REALTIME
-    if any(w in q for w in ["mlops", "model", "training", "deploying models", "prediction"]):
-        tags.append("mlops")
-    if any(w in q for w in ["real-time", "realtime", "stream", "sensor", "modbus", "iot"]):
-        tags.append("realtime")
-        tags.append("sensor_data")
-    if any(w in q for w in ["pipeline", "data", "ingestion", "processing"]):
-        tags.append("data_ingestion")
-        tags.append("data_processing")
-
-    # FALLBACK: generic behavioral project
-    if not tags and any(w in q for w in ["project", "situation", "example", "experience"]):
-        tags.append("ownership")
-        tags.append("deadline")
-
-    # Deduplicate, keep order
-    seen = set()
-    deduped = []
-    for t in tags:
-        if t not in seen:
-            seen.add(t)
-            deduped.append(t)
-    return deduped
-
-
 def _similarity(a: str, b: str) -> float:
     from difflib import SequenceMatcher
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
@@ -353,7 +195,8 @@ def _is_behavioral_followup(question: str, last_intent: str | None) -> bool:
 # ---------- Answer Engine ----------
 
 class AnswerEngine:
-    def __init__(self, role: str, resume_path: str, jd_path: str):
+    def __init__(self, role: str, resume_path: str, jd_path: str, near_dup: dict | None = None,
+                 semantic: dict | None = None, write_through: bool = True):
         self.role = role
 
         # load resume + JD once
@@ -375,6 +218,29 @@ class AnswerEngine:
         # answer bank (built from past sessions by tools/build_answer_bank.py)
         answer_bank_path = os.path.join(base_dir, "data", "answer_bank.jsonl")
         self.answer_retriever = AnswerRetriever(answer_bank_path)
+        # fresh answers are appended to the bank as they are generated (answers.write_through)
+        self.write_through = bool(write_through)
+
+        # questions answered this session: ASR variants of one of them reuse its answer
+        # instead of another LLM call (answers.near_dup in settings.yaml)
+        near_dup = near_dup or {}
+        self.recent_questions = None
+        if near_dup.get("enabled", True):
+            self.recent_questions = NearDuplicateIndex(
+                threshold=float(near_dup.get("threshold", 0.6)),
+                num_perm=int(near_dup.get("num_perm", 64)),
+                capacity=int(near_dup.get("capacity", 1000)),
+            )
+        self.last_duplicate_of: str | None = None  # earlier question the last answer was reused from
+
+        # optional: answer-bank lookup by embedding similarity, for paraphrases
+        # the lexical match misses (answers.semantic in settings.yaml)
+        semantic = semantic or {}
+        self.semantic_retriever = None
+        self.semantic_threshold = float(semantic.get("threshold", 0.85))
+        # built even for an empty bank: write-through answers are added to it as they come
+        if semantic.get("enabled", False):
+            self.semantic_retriever = self._build_semantic(semantic, base_dir)
 
         # simple session state for follow-ups
         self.last_question: str | None = None
@@ -427,8 +293,25 @@ Instructions:
 
     def generate_answer(self, question: str):
         q = question.strip()
-
-        # 0) Try to reuse from answer bank first — but only for very close matches
+        self.last_duplicate_of = None
+
+        # 0) Same question as one already answered this session (ASR variant)?
+        #    Follow-ups depend on the story told just before, so they are never reused.
+        if self.recent_questions is not None and not _is_behavioral_followup(q, self.last_intent):
+            hit = self.recent_questions.find(q)
+            if hit is not None:
+                earlier_q, (bullets, intent, project), sim = hit
+                print(f"[DEBUG] Near-duplicate of earlier question {earlier_q!r} (similarity={sim:.2f}), reusing its answer")
+                self.last_duplicate_of = earlier_q
+                # the earlier answer is what was just said: follow-ups must build on it
+                self.last_question = q
+                self.last_intent = intent
+                if intent == "behavioral_project":
+                    self.last_behavioral_project = project
+                    self.last_behavioral_answer = bullets
+                return bullets
+
+        # Try to reuse from answer bank first — but only for very close matches
         reused = None
         if self.answer_retriever is not None:
             # require a tight match; answer_retriever now returns overlap too
@@ -440,11 +323,30 @@ Instructions:
                     print(f"[DEBUG] Reusing answer from history (score={score:.2f}, overlap={overlap:.2f}) for question similar to: {matched_q!r}")
                     self.last_question = q
                     self.last_intent = classify_question_intent(matched_q)
+                    self._remember(q, bullets, self.last_intent)
                     return bullets
                 else:
                     # do NOT reuse; we could use as suggestion, but prefer fresh generation
                     print(f"[DEBUG] Candidate historical match found (score={score:.2f}, overlap={overlap:.2f}) but below reuse criteria - generating fresh answer.")
 
+        # Paraphrase of a bank question? Only reused when both ask for the same kind of answer.
+        if self.semantic_retriever is not None and not _is_behavioral_followup(q, self.last_intent):
+            try:
+                found = self.semantic_retriever.find_best(q, threshold=self.semantic_threshold)
+            except Exception as e:
+                print(f"[WARN] Semantic lookup failed: {e}")
+                found = None
+            if found:
+                bullets, matched_q, score = found
+                matched_intent = classify_question_intent(matched_q)
+                if matched_intent == classify_question_intent(q):
+                    print(f"[DEBUG] Reusing answer from history (semantic score={score:.2f}) for paraphrase of: {matched_q!r}")
+                    self.last_question = q
+                    self.last_intent = matched_intent
+                    self._remember(q, bullets, matched_intent)
+                    return bullets
+                print(f"[DEBUG] Semantic match {matched_q!r} (score={score:.2f}) has a different intent - generating fresh answer.")
+
         # 1) Normal fresh path
         base_intent = classify_question_intent(q)
 
@@ -606,7 +508,44 @@ Instructions:
                 self.last_behavioral_project = project
                 self.last_behavioral_answer = bullets
 
+            if intent != "behavioral_followup":
+                self._remember(q, bullets, intent, project)
+                self._save_to_bank(q, bullets)
             return bullets
 
         except Exception as e:
             return [f"(LLM error: {e})"]
+
+    def _build_semantic(self, cfg: dict, base_dir: str):
+        model = cfg.get("model", ollama_client.EMBED_MODEL_NAME)
+        url = cfg.get("url", ollama_client.OLLAMA_EMBED_URL)
+        cache_dir = cfg.get("cache_dir") or os.path.join(base_dir, "data", "embedding_cache")
+        embed_fn = lambda texts: ollama_client.embed(texts, model=model, url=url)
+        try:
+            cache = EmbeddingCache(cache_dir, model, embed_fn)
+            retriever = SemanticRetriever(self.answer_retriever, cache)
+        except Exception as e:
+            print(f"[WARN] Semantic retrieval disabled, could not embed the answer bank with {model!r} at {url}: {e}")
+            return None
+        print(f"[INFO] Semantic retrieval on: {len(retriever.index)} bank questions, "
+              f"{cache.misses} newly embedded, {cache.hits} from cache")
+        return retriever
+
+    def _remember(self, question: str, bullets: list[str], intent: str, project: dict | None = None) -> None:
+        """Keep the answer (and the session state it leaves behind) for near-duplicates of `question`."""
+        if self.recent_questions is not None:
+            self.recent_questions.add(question, (bullets, intent, project))
+
+    def _save_to_bank(self, question: str, bullets: list[str]) -> None:
+        if not self.write_through or self.answer_retriever is None:
+            return
+        try:
+            self.answer_retriever.add(question, bullets)
+        except OSError as e:
+            print(f"[WARN] Could not append answer to the answer bank: {e}")
+            return
+        if self.semantic_retriever is not None:
+            try:
+                self.semantic_retriever.sync()
+            except Exception as e:
+                print(f"[WARN] Could not add answer to the semantic index: {e}")
@@ -1,63 +1,474 @@
 # core/answer_retriever.py
 
+import io
 import os
+import re
 import json
+import heapq
+import hashlib
 from typing import List, Dict, Optional, Tuple
 from difflib import SequenceMatcher
 
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+")
+
+# a gram is only treated as a stop-gram (see NgramIndex) once it is in more questions than this
+MIN_STOP_DF = 20
+
+# bump when the on-disk index layout changes; older indexes are then treated as stale
+INDEX_VERSION = 2
+_INDEX_ARRAYS = ("vocab", "idf", "ptr", "rows", "vals", "stop")
+
+# the last bytes the index covers are hashed, to tell lines appended since from a rewrite
+_TAIL_CHECK_BYTES = 4096
+
+
+def _prepare(text: str) -> str:
+    """Lowercased, whitespace-collapsed, padded with a space so word starts/ends form their own grams."""
+    return " " + _WHITESPACE.sub(" ", text.lower()).strip() + " "
+
+
+def gram_codes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Byte 3-grams of every prepared text as (doc index, 24-bit code) arrays.
+
+    Texts are UTF-8 encoded and joined; a gram is the three bytes packed into
+    one integer, so no vocabulary or hashing is needed and codes are the same
+    in every process. Grams that would span two texts are dropped.
+    """
+    encoded = [_prepare(t).encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int32)
+    if len(buf) < 3:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    codes = (buf[:-2] << 16) | (buf[1:-1] << 8) | buf[2:]
+    docs = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+    # a gram starting at i belongs to one text only if i + 2 is still inside it
+    keep = docs[:-2] == docs[2:]
+    return docs[:-2][keep], codes[keep]
+
+
+class NgramIndex:
+    """
+    TF-IDF over character (byte) 3-grams, stored as postings per gram.
+
+    Built once from all stored questions: every gram gets an idf, every
+    question an L2-normalized vector of sublinear-tf * idf weights. The
+    non-zero weights are kept sorted by gram (`vocab`, `ptr`, `rows`,
+    `vals`, the columns of a CSC matrix), so scoring a query reads only the
+    postings of its own ~50 grams and accumulates cosine scores for all
+    questions with one np.bincount. Grams found in more than `max_df` of
+    the questions (" yo", "you", "hat" ...) are left out of the index
+    altogether: they carry little weight and hold most of the postings.
+    Candidates only need to rank the right question near the top; the
+    final score comes from re-ranking (see AnswerRetriever).
+
+    Usage:
+        idx = NgramIndex(["how do you monitor drift", ...])
+        for row, cosine in idx.top_k("how would you monitor model drift", k=5):
+            ...
+    """
+
+    def __init__(self, texts: List[str], max_df: float = 0.1):
+        self.n_docs = len(texts)
+        self.max_df = float(max_df)
+        docs, codes = gram_codes(texts)
+
+        # one (doc, gram) pair per distinct gram of a doc, with its count
+        pair, counts = np.unique((docs << 24) | codes, return_counts=True)
+        pair_docs = (pair >> 24).astype(np.int32)
+        vocab, pair_gram = np.unique(pair & 0xFFFFFF, return_inverse=True)
+        df = np.bincount(pair_gram, minlength=len(vocab))
+
+        # stop-grams: drop them from the vocabulary and their pairs from the postings
+        kept = df <= max(MIN_STOP_DF, self.max_df * self.n_docs)
+        new_pos = np.cumsum(kept) - 1
+        in_vocab = kept[pair_gram]
+        pair_docs, counts, pair_gram = pair_docs[in_vocab], counts[in_vocab], new_pos[pair_gram[in_vocab]]
+        self.stop = vocab[~kept]
+        self.vocab, df = vocab[kept], df[kept]
+        self.idf = (np.log((1.0 + self.n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        weights = (1.0 + np.log(counts)).astype(np.float32) * self.idf[pair_gram]
+        norms = np.sqrt(np.bincount(pair_docs, weights=weights * weights, minlength=self.n_docs))
+        weights /= np.maximum(norms, 1e-12)[pair_docs].astype(np.float32)
+
+        order = np.argsort(pair_gram, kind="stable")
+        self.rows = pair_docs[order]
+        self.vals = weights[order]
+        self.ptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def save(self, index_dir: str) -> None:
+        for name in _INDEX_ARRAYS:
+            np.save(os.path.join(index_dir, name + ".npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, index_dir: str, n_docs: int, max_df: float) -> "NgramIndex":
+        """An index saved with save(), memory-mapped rather than read into memory."""
+        index = cls.__new__(cls)
+        index.n_docs = int(n_docs)
+        index.max_df = float(max_df)
+        for name in _INDEX_ARRAYS:
+            setattr(index, name, np.load(os.path.join(index_dir, name + ".npy"), mmap_mode="r"))
+        return index
+
+    def query_vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(gram positions in vocab, L2-normalized weights) of a query; grams not in the index are ignored."""
+        _, codes = gram_codes([text])
+        codes, counts = np.unique(codes, return_counts=True)
+        if len(self.vocab) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        pos = np.minimum(np.searchsorted(self.vocab, codes), len(self.vocab) - 1)
+        known = self.vocab[pos] == codes
+        pos, counts = pos[known], counts[known]
+        w = (1.0 + np.log(counts)) * self.idf[pos]
+        norm = np.sqrt(np.sum(w * w))
+        return pos, (w / norm if norm > 0 else w).astype(np.float32)
+
+    def gram_weights(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (gram codes, L2-normalized weights) of `text` weighted like this
+        index, for questions added after it was built (see TailIndex):
+        stop-grams are dropped and grams the index never saw get the idf of
+        a gram in no question.
+        """
+        _, codes = gram_codes([text])
+        codes, counts = np.unique(codes, return_counts=True)
+        if len(self.stop):
+            not_stop = ~np.isin(codes, self.stop)
+            codes, counts = codes[not_stop], counts[not_stop]
+        idf = np.full(len(codes), np.log(1.0 + self.n_docs) + 1.0, dtype=np.float32)
+        if len(self.vocab) and len(codes):
+            pos = np.minimum(np.searchsorted(self.vocab, codes), len(self.vocab) - 1)
+            known = self.vocab[pos] == codes
+            idf[known] = self.idf[pos[known]]
+        w = (1.0 + np.log(counts)) * idf
+        norm = np.sqrt(np.sum(w * w))
+        return codes, (w / norm if norm > 0 else w).astype(np.float32)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of `text` to every stored question."""
+        pos, w = self.query_vector(text)
+        if len(pos) == 0:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        starts, ends = self.ptr[pos], self.ptr[pos + 1]
+        lengths = ends - starts
+        # all postings of the query grams in one gather
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        weights = self.vals[idx] * np.repeat(w, lengths)
+        return np.bincount(self.rows[idx], weights=weights, minlength=self.n_docs)
+
+    def top_k(self, text: str, k: int = 5) -> List[Tuple[int, float]]:
+        """The `k` best (row, cosine) pairs, best first."""
+        if self.n_docs == 0:
+            return []
+        s = self.scores(text)
+        k = min(k, self.n_docs)
+        top = np.argpartition(-s, k - 1)[:k]
+        top = top[np.argsort(-s[top], kind="stable")]
+        return [(int(i), float(s[i])) for i in top if s[i] > 0]
+
+
+class TailIndex:
+    """
+    Questions added to an answer bank after its NgramIndex was built
+    (AnswerRetriever.add(), or lines appended to the JSONL since the index
+    was written). Each one is weighted with the base index's idf and its
+    grams are appended to per-gram posting lists, so an add costs only the
+    question's own ~50 grams, whatever the size of the bank. Rows are
+    numbered from 0 in the order they were added.
+    """
+
+    def __init__(self, base: NgramIndex):
+        self.base = base
+        self.n_docs = 0
+        self._postings: Dict[int, List[Tuple[int, float]]] = {}
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def add(self, text: str) -> None:
+        row = self.n_docs
+        codes, w = self.base.gram_weights(text)
+        for code, weight in zip(codes.tolist(), w.tolist()):
+            self._postings.setdefault(code, []).append((row, weight))
+        self.n_docs += 1
+
+    def top_k(self, text: str, k: int = 5) -> List[Tuple[int, float]]:
+        """The `k` best (row, cosine) pairs, best first."""
+        if self.n_docs == 0:
+            return []
+        codes, w = self.base.gram_weights(text)
+        scores: Dict[int, float] = {}
+        for code, qw in zip(codes.tolist(), w.tolist()):
+            for row, weight in self._postings.get(code, ()):
+                scores[row] = scores.get(row, 0.0) + qw * weight
+        best = heapq.nlargest(k, scores.items(), key=lambda rs: rs[1])
+        return [(row, score) for row, score in best if score > 0]
+
+
+def token_overlap(a: str, b: str) -> float:
+    """Jaccard overlap of the word sets of `a` and `b`."""
+    ta, tb = set(_TOKEN.findall(a.lower())), set(_TOKEN.findall(b.lower()))
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+# ---------- prebuilt index (tools/build_answer_bank.py) ----------
+
+def index_dir_for(jsonl_path: str) -> str:
+    """data/answer_bank.jsonl -> data/answer_bank.index"""
+    return os.path.splitext(jsonl_path)[0] + ".index"
+
+
+def _jsonl_stamp(path: str) -> Dict:
+    st = os.stat(path)
+    return {"jsonl_size": st.st_size, "jsonl_mtime_ns": st.st_mtime_ns}
+
+
+def _tail_sha1(path: str, start: int, end: int) -> str:
+    """sha1 of bytes [start, end) of a file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def read_bank(path: str, start: int = 0, end: Optional[int] = None) -> Tuple[List[Dict], List[int]]:
+    """Valid entries of an answer-bank JSONL (bytes `start` to `end`) and the byte offset of each one's line."""
+    entries: List[Dict] = []
+    offsets: List[int] = []
+    pos = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = f if end is None else io.BytesIO(f.read(max(0, end - start)))
+        for raw in lines:
+            start, pos = pos, pos + len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(obj, dict) and "question" in obj and "bullets" in obj:
+                entries.append(obj)
+                offsets.append(start)
+    return entries, offsets
+
+
+def build_index(jsonl_path: str, index_dir: Optional[str] = None, max_df: float = 0.1) -> str:
+    """
+    Write the retrieval index for an answer-bank JSONL to `index_dir`
+    (default: next to it, see index_dir_for()): the NgramIndex arrays, the
+    questions as one UTF-8 blob with offsets, and the byte offset of every
+    entry's JSONL line, so bullets can be read on demand. meta.json records
+    the JSONL's size and mtime plus the offset and sha1 of its last few KiB,
+    so lines appended afterwards can be told apart from a rewrite without
+    reading the whole file; it is written last, so a half-written index is
+    never picked up.
+    """
+    index_dir = index_dir or index_dir_for(jsonl_path)
+    stamp = _jsonl_stamp(jsonl_path)  # before reading: a later write makes the index stale
+    stamp["jsonl_tail_offset"] = max(0, stamp["jsonl_size"] - _TAIL_CHECK_BYTES)
+    stamp["jsonl_tail_sha1"] = _tail_sha1(jsonl_path, stamp["jsonl_tail_offset"], stamp["jsonl_size"])
+    entries, offsets = read_bank(jsonl_path, end=stamp["jsonl_size"])
+    questions = [e.get("question", "") for e in entries]
+
+    os.makedirs(index_dir, exist_ok=True)
+    meta_path = os.path.join(index_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    NgramIndex(questions, max_df=max_df).save(index_dir)
+    encoded = [q.encode("utf-8") for q in questions]
+    q_ptr = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=q_ptr[1:])
+    np.save(os.path.join(index_dir, "questions.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(index_dir, "question_ptr.npy"), q_ptr)
+    np.save(os.path.join(index_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+
+    meta = dict(stamp, version=INDEX_VERSION, entries=len(entries), max_df=max_df)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return index_dir
+
 
 class AnswerRetriever:
-    def __init__(self, path: str):
+    """
+    Finds the closest already-answered question in the answer bank.
+
+    Candidates come from an n-gram TF-IDF index (NgramIndex), so a lookup
+    costs a few milliseconds even with a large bank. The best `rerank`
+    candidates are then scored with SequenceMatcher, the similarity the
+    reuse thresholds in AnswerEngine were tuned on; with `rerank=0` the
+    TF-IDF cosine is the score.
+
+    If tools/build_answer_bank.py left an up-to-date index next to the JSONL
+    (see build_index()), it is memory-mapped and entries are read from the
+    JSONL only when their bullets are needed. Otherwise (no index, or the
+    JSONL changed since it was built) the JSONL is parsed and indexed in
+    memory, as before. Lines appended to the JSONL after the index was
+    built don't make it stale: they are read and indexed in memory.
+
+    add() writes a new pair through: it is appended to the JSONL (fsynced)
+    and to a TailIndex, so it is found by the next lookup in this process
+    and survives a restart, without rebuilding the index.
+    """
+
+    def __init__(self, path: str, rerank: int = 5, index_dir: Optional[str] = None):
         self.path = path
-        self.qa_list: List[Dict] = []
+        self.rerank = int(rerank)
+        self.index_dir = index_dir or index_dir_for(path)
+        self.qa_list: List[Dict] = []            # entries, when loaded from the JSONL
+        self.index: Optional[NgramIndex] = None
+        self.tail: Optional[TailIndex] = None
+        self.added: List[Dict] = []              # entries in `tail`, in row order
+        self._offsets: Optional[np.ndarray] = None  # JSONL byte offsets, when loaded from the index
+        self._questions: Optional[np.ndarray] = None
+        self._question_ptr: Optional[np.ndarray] = None
         self._load()
 
     def _load(self):
         if not os.path.exists(self.path):
-            print(f"[INFO] No answer_bank found at {self.path}, history reuse disabled.")
+            print(f"[INFO] No answer_bank found at {self.path}, starting with an empty one.")
             self.qa_list = []
+            self.index = NgramIndex([])
+            self.tail = TailIndex(self.index)
             return
 
-        qa_list: List[Dict] = []
-        with open(self.path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    if "question" in obj and "bullets" in obj:
-                        qa_list.append(obj)
-                except json.JSONDecodeError:
-                    continue
+        if self._load_index():
+            return
 
+        qa_list, _ = read_bank(self.path)
         self.qa_list = qa_list
+        self.index = NgramIndex([qa.get("question", "") for qa in qa_list])
+        self.tail = TailIndex(self.index)
         print(f"[INFO] Loaded {len(self.qa_list)} historical Q&A entries from {self.path}")
 
+    def _load_index(self) -> bool:
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            stamp = _jsonl_stamp(self.path)
+            indexed_size = meta.get("jsonl_size", -1)
+            unchanged = all(meta.get(k) == v for k, v in stamp.items())
+            # grown since the build: taken as append-only (e.g. AnswerRetriever.add) if the
+            # last indexed bytes are unchanged; an edit further back isn't caught here
+            tail_offset = meta.get("jsonl_tail_offset", -1)
+            appended = (not unchanged and 0 <= tail_offset <= indexed_size < stamp["jsonl_size"]
+                        and meta.get("jsonl_tail_sha1") == _tail_sha1(self.path, tail_offset, indexed_size))
+            if meta.get("version") != INDEX_VERSION or not (unchanged or appended):
+                print(f"[INFO] Answer bank index {self.index_dir} is out of date, reading {self.path} instead "
+                      f"(rebuild it with tools/build_answer_bank.py)")
+                return False
+            self.index = NgramIndex.load(self.index_dir, meta["entries"], meta["max_df"])
+            mmap = lambda name: np.load(os.path.join(self.index_dir, name + ".npy"), mmap_mode="r")
+            self._offsets = mmap("offsets")
+            self._questions = mmap("questions")
+            self._question_ptr = mmap("question_ptr")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Could not load answer bank index {self.index_dir}: {e}")
+            self.index = None
+            self._offsets = self._questions = self._question_ptr = None
+            return False
+
+        self.tail = TailIndex(self.index)
+        if appended:
+            for entry in read_bank(self.path, start=indexed_size)[0]:
+                self._add_entry(entry)
+        print(f"[INFO] Loaded index of {len(self._offsets)} historical Q&A entries from {self.index_dir}"
+              + (f", plus {len(self.added)} appended since it was built" if self.added else ""))
+        return True
+
+    def _base_len(self) -> int:
+        return len(self._offsets) if self._offsets is not None else len(self.qa_list)
+
+    def __len__(self) -> int:
+        return self._base_len() + len(self.added)
+
+    def _add_entry(self, entry: Dict) -> None:
+        self.added.append(entry)
+        self.tail.add(entry.get("question", ""))
+
+    def add(self, question: str, bullets: List[str], **fields) -> Dict:
+        """
+        Append a Q&A pair to the bank: one JSONL line, flushed and fsynced
+        before returning, and indexed in memory so find_best() sees it
+        right away. Returns the entry written.
+        """
+        entry = {"question": question.strip(), "bullets": list(bullets), **fields}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+b") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line  # don't glue onto a torn last line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._add_entry(entry)
+        return entry
+
+    def question(self, i: int) -> str:
+        if i >= self._base_len():
+            return self.added[i - self._base_len()].get("question", "")
+        if self._offsets is None:
+            return self.qa_list[i].get("question", "")
+        start, end = self._question_ptr[i], self._question_ptr[i + 1]
+        return self._questions[start:end].tobytes().decode("utf-8")
+
+    def entry(self, i: int) -> Dict:
+        """Entry `i` of the bank; read from its JSONL line when the index is memory-mapped."""
+        if i >= self._base_len():
+            return self.added[i - self._base_len()]
+        if self._offsets is None:
+            return self.qa_list[i]
+        with open(self.path, "rb") as f:
+            f.seek(int(self._offsets[i]))
+            return json.loads(f.readline())
+
     @staticmethod
     def _similarity(a: str, b: str) -> float:
         return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
     def find_best(
         self, question: str, threshold: float = 0.8
-    ) -> Optional[Tuple[List[str], str, float]]:
-        """Return (bullets, matched_question, score) or None if no good match."""
-        if not self.qa_list:
+    ) -> Optional[Tuple[List[str], str, float, float]]:
+        """Return (bullets, matched_question, score, token_overlap) or None if no good match."""
+        if not len(self) or self.index is None:
             return None
 
-        best = None
-        best_score = 0.0
         q = question.strip()
+        k = max(self.rerank, 1)
+        candidates = self.index.top_k(q, k=k)
+        if self.added:
+            base = self._base_len()
+            candidates += [(base + row, score) for row, score in self.tail.top_k(q, k=k)]
+            candidates.sort(key=lambda rs: -rs[1])
+        if not candidates:
+            return None
 
-        for entry in self.qa_list:
-            stored_q = entry.get("question", "")
-            score = self._similarity(q, stored_q)
-            if score > best_score:
-                best_score = score
-                best = entry
+        if self.rerank > 0:
+            scored = [(self._similarity(q, self.question(i)), i) for i, _ in candidates]
+            best_score, best_i = max(scored, key=lambda si: si[0])
+        else:
+            best_i, best_score = candidates[0]
 
-        if best is None or best_score < threshold:
+        if best_score < threshold:
             return None
 
-        bullets = best.get("bullets", [])
-        return bullets, best.get("question", ""), best_score
+        best = self.entry(best_i)
+        matched_q = best.get("question", "")
+        return best.get("bullets", []), matched_q, best_score, token_overlap(q, matched_q)
@@ -1,51 +1,334 @@
-import pyaudio
+# core/audio_capture.py
+
+import time
+import wave
 import numpy as np
 import yaml
-from queue import Queue
+from collections import deque
+from dataclasses import dataclass, asdict
+from queue import Queue, Full, Empty
 
-cfg_audio = yaml.safe_load(open("config/settings.yaml"))["audio"]
 
-def capture_stream(q: Queue, stop_flag):
+BACKPRESSURE_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class BufferPool:
     """
-    Continuous capture from WASAPI loopback (desktop audio) and push int16 numpy arrays to q.
-    """
-    FORMAT = pyaudio.paInt16
-    RATE = int(cfg_audio["rate"])
-    CHANNELS = int(cfg_audio["channels"])
-    CHUNK_MS = int(cfg_audio["chunk_ms"])
-    FRAMES_PER_BUFFER = int(RATE * CHUNK_MS / 1000)
-    DEVICE_INDEX = int(cfg_audio["input_device"])
-
-    pa = pyaudio.PyAudio()
-    print(f"[INFO] Opening WASAPI loopback device {DEVICE_INDEX} at {RATE} Hz...")
-    stream = pa.open(
-        format=FORMAT,
-        channels=CHANNELS,
-        rate=RATE,
-        input=True,
-        input_device_index=DEVICE_INDEX,
-        frames_per_buffer=FRAMES_PER_BUFFER,
-    )
+    Fixed set of preallocated int16 buffers handed out to the capture side.
 
-    print("[INFO] Capturing system audio. Press Ctrl+C to stop.")
-    try:
-        while not stop_flag.is_set():
-            data = stream.read(FRAMES_PER_BUFFER, exception_on_overflow=False)
-            np_data = np.frombuffer(data, dtype=np.int16)
+    The consumer gives a buffer back with release() once it has copied the
+    samples out, so steady-state capture allocates nothing. If the pool runs
+    dry a fresh array is allocated and counted as a miss.
+    """
+
+    def __init__(self, count: int, n_samples: int):
+        self.n_samples = int(n_samples)
+        self._free = deque(np.zeros(self.n_samples, dtype=np.int16) for _ in range(int(count)))
+        self.misses = 0
+
+    def acquire(self, n: int) -> np.ndarray:
+        if n <= self.n_samples:
             try:
-                q.put_nowait(np_data)
-            except:
-                # If the queue is full, drop the oldest by getting once then put.
+                return self._free.pop()[:n]
+            except IndexError:
+                pass
+        self.misses += 1
+        return np.empty(n, dtype=np.int16)
+
+    def release(self, chunk: np.ndarray) -> None:
+        root = chunk if chunk.base is None else chunk.base
+        if isinstance(root, np.ndarray) and root.shape == (self.n_samples,):
+            self._free.append(root)
+
+
+@dataclass
+class CaptureStats:
+    """Counters for what happened between the device and the consumer queue."""
+    chunks: int = 0
+    frames: int = 0
+    dropped_chunks: int = 0
+    dropped_frames: int = 0
+    input_overflows: int = 0
+    queue_high_water: int = 0
+    pool_misses: int = 0
+
+    def snapshot(self) -> dict:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (f"[STATS] capture: {self.chunks} chunks, dropped {self.dropped_chunks} chunks "
+                f"({self.dropped_frames} frames), input overflows {self.input_overflows}, "
+                f"queue high-water {self.queue_high_water}, pool misses {self.pool_misses}")
+
+
+class AudioSource:
+    """
+    Base class for anything that feeds the live pipeline.
+
+    Subclasses push interleaved int16 numpy chunks into `q` from run() until
+    `stop_flag` is set or the source is exhausted, then set `stop_flag`.
+    `rate` and `channels` describe the chunks they produce.
+
+    Chunks come from a BufferPool; the consumer should call release(chunk)
+    after copying the samples out. What happens when `q` is full is decided
+    by `backpressure`:
+        drop_oldest  discard the oldest queued chunk (default, lowest latency)
+        drop_newest  discard the incoming chunk
+        block        wait up to block_timeout_ms for room, then drop the incoming chunk
+                     (None waits indefinitely)
+    Every drop is counted in `stats`.
+    """
+
+    name = "base"
+
+    def __init__(self, rate: int, channels: int, chunk_ms: int,
+                 backpressure: str = "drop_oldest", block_timeout_ms: float | None = 200,
+                 pool_size: int = 24):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}, got {backpressure!r}")
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.chunk_ms = int(chunk_ms)
+        self.frames_per_buffer = int(self.rate * self.chunk_ms / 1000)
+        self.backpressure = backpressure
+        self.block_timeout_ms = block_timeout_ms
+        self.pool = BufferPool(pool_size, self.frames_per_buffer * self.channels)
+        self.stats = CaptureStats()
+        self._warned_drop = False
+
+    def run(self, q: Queue, stop_flag) -> None:
+        raise NotImplementedError
+
+    def release(self, chunk: np.ndarray) -> None:
+        """Return a chunk's buffer to the pool once the consumer is done with it."""
+        self.pool.release(chunk)
+
+    def _emit(self, q: Queue, samples: np.ndarray, stop_flag=None) -> None:
+        """Copy `samples` into a pooled buffer and offer it to `q` under the backpressure policy."""
+        chunk = self.pool.acquire(len(samples))
+        chunk[:] = samples
+        self.stats.chunks += 1
+        self.stats.frames += len(chunk) // self.channels
+        self.stats.pool_misses = self.pool.misses
+
+        if self.backpressure == "block":
+            queued = self._put_blocking(q, chunk, stop_flag)
+        else:
+            try:
+                q.put_nowait(chunk)
+                queued = True
+            except Full:
+                queued = False
+
+        if not queued:
+            if self.backpressure == "drop_oldest":
                 try:
-                    q.get_nowait()
-                    q.put_nowait(np_data)
-                except:
+                    self._count_drop(q.get_nowait())
+                except Empty:
                     pass
-    except KeyboardInterrupt:
-        pass
-    finally:
-        stream.stop_stream()
-        stream.close()
-        pa.terminate()
-        stop_flag.set()
-        print("[INFO] Audio stream closed.")
+                try:
+                    q.put_nowait(chunk)
+                    queued = True
+                except Full:
+                    pass
+            if not queued:
+                self._count_drop(chunk)
+
+        self.stats.queue_high_water = max(self.stats.queue_high_water, q.qsize())
+
+    def _put_blocking(self, q: Queue, chunk: np.ndarray, stop_flag) -> bool:
+        if self.block_timeout_ms is not None:
+            try:
+                q.put(chunk, timeout=self.block_timeout_ms / 1000.0)
+                return True
+            except Full:
+                return False
+        # wait for the consumer indefinitely, but stay stoppable
+        while stop_flag is None or not stop_flag.is_set():
+            try:
+                q.put(chunk, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _count_drop(self, chunk: np.ndarray) -> None:
+        self.stats.dropped_chunks += 1
+        self.stats.dropped_frames += len(chunk) // self.channels
+        self.release(chunk)
+        if not self._warned_drop:
+            self._warned_drop = True
+            print(f"[WARN] Capture queue full, dropping audio (backpressure={self.backpressure}).")
+
+
+class LoopbackSource(AudioSource):
+    """
+    Continuous capture from WASAPI loopback (desktop audio) via PyAudio.
+
+    capture_mode "callback" (default) lets PortAudio call us with each buffer and
+    reports input overflows; "blocking" uses stream.read() in this thread.
+    The callback runs on PortAudio's real-time thread and must never wait, so
+    backpressure "block" is treated as "drop_newest" in callback mode.
+    """
+
+    name = "loopback"
+
+    def __init__(self, rate: int, channels: int, chunk_ms: int, device_index: int,
+                 capture_mode: str = "callback", **kwargs):
+        super().__init__(rate, channels, chunk_ms, **kwargs)
+        if capture_mode not in ("callback", "blocking"):
+            raise ValueError(f"capture_mode must be 'callback' or 'blocking', got {capture_mode!r}")
+        self.device_index = int(device_index)
+        self.capture_mode = capture_mode
+        if capture_mode == "callback" and self.backpressure == "block":
+            print("[WARN] audio.backpressure 'block' would stall PortAudio's callback thread; "
+                  "using 'drop_newest' in callback mode (set audio.capture_mode: blocking to block).")
+            self.backpressure = "drop_newest"
+
+    def run(self, q: Queue, stop_flag) -> None:
+        import pyaudio  # Windows-only in practice; keep import local so replay works elsewhere
+
+        def on_audio(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self.stats.input_overflows += 1
+            self._emit(q, np.frombuffer(in_data, dtype=np.int16), stop_flag)
+            return None, (pyaudio.paComplete if stop_flag.is_set() else pyaudio.paContinue)
+
+        callback = on_audio if self.capture_mode == "callback" else None
+
+        pa = pyaudio.PyAudio()
+        print(f"[INFO] Opening WASAPI loopback device {self.device_index} at {self.rate} Hz "
+              f"({self.capture_mode} mode)...")
+        stream = pa.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=callback,
+        )
+
+        print("[INFO] Capturing system audio. Press Ctrl+C to stop.")
+        try:
+            if callback is not None:
+                stream.start_stream()
+                while not stop_flag.is_set() and stream.is_active():
+                    stop_flag.wait(0.2)
+            else:
+                while not stop_flag.is_set():
+                    data = stream.read(self.frames_per_buffer, exception_on_overflow=False)
+                    self._emit(q, np.frombuffer(data, dtype=np.int16), stop_flag)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stream.stop_stream()
+            stream.close()
+            pa.terminate()
+            stop_flag.set()
+            print("[INFO] Audio stream closed.")
+
+
+class WavReplaySource(AudioSource):
+    """
+    Replay a 16-bit PCM WAV file into the pipeline.
+
+    speed > 0 paces chunks at `speed` x real time (1.0 = as recorded) and applies
+    the configured backpressure policy, like live capture does.
+    speed <= 0 pushes as fast as the consumer takes them (blocking put, no drops),
+    which is what you want for measuring the pipeline's real-time factor.
+    """
+
+    name = "wav"
+
+    def __init__(self, path: str, chunk_ms: int = 20, speed: float = 1.0, **kwargs):
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+            rate = wf.getframerate()
+            channels = wf.getnchannels()
+        self.speed = float(speed)
+        if self.speed <= 0:
+            kwargs.update(backpressure="block", block_timeout_ms=None)
+        super().__init__(rate, channels, chunk_ms, **kwargs)
+        self.path = path
+
+    def run(self, q: Queue, stop_flag) -> None:
+        pace = f"{self.speed:g}x" if self.speed > 0 else "max speed"
+        print(f"[INFO] Replaying {self.path} ({self.rate} Hz, {self.channels} ch) at {pace}...")
+        t0 = time.perf_counter()
+        sent_frames = 0
+        try:
+            with wave.open(self.path, "rb") as wf:
+                while not stop_flag.is_set():
+                    data = wf.readframes(self.frames_per_buffer)
+                    if not data:
+                        break
+                    samples = np.frombuffer(data, dtype=np.int16)
+
+                    if self.speed > 0:
+                        due = t0 + (sent_frames / self.rate) / self.speed
+                        delay = due - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    self._emit(q, samples, stop_flag)
+                    sent_frames += len(samples) // self.channels
+        finally:
+            stop_flag.set()
+            print(f"[INFO] Replay finished: {sent_frames / self.rate:.1f} s of audio "
+                  f"in {time.perf_counter() - t0:.1f} s.")
+
+
+def parse_speed(value) -> float:
+    """'max' (or 0) means as fast as possible; otherwise a real-time multiplier."""
+    if isinstance(value, str) and value.strip().lower() in ("max", "fast", "asap"):
+        return 0.0
+    return float(value)
+
+
+def make_source(audio_cfg: dict, source: str | None = None, path: str | None = None,
+                speed=None) -> AudioSource:
+    """
+    Build the configured audio source. Explicit arguments (e.g. from the CLI)
+    override `audio.source`, `audio.replay_path` and `audio.replay_speed`.
+    Queueing behaviour comes from `audio.backpressure`, `audio.block_timeout_ms`
+    and `audio.queue_size` (the pool holds a few more buffers than the queue).
+    """
+    kind = (source or audio_cfg.get("source", "loopback")).lower()
+    chunk_ms = int(audio_cfg.get("chunk_ms", 20))
+    block_timeout_ms = audio_cfg.get("block_timeout_ms", 200)
+    queue_opts = dict(
+        backpressure=audio_cfg.get("backpressure", "drop_oldest"),
+        block_timeout_ms=None if block_timeout_ms is None else float(block_timeout_ms),
+        pool_size=int(audio_cfg.get("queue_size", 20)) + 4,
+    )
+
+    if kind == "loopback":
+        return LoopbackSource(
+            rate=int(audio_cfg["rate"]),
+            channels=int(audio_cfg["channels"]),
+            chunk_ms=chunk_ms,
+            device_index=int(audio_cfg["input_device"]),
+            capture_mode=audio_cfg.get("capture_mode", "callback"),
+            **queue_opts,
+        )
+
+    if kind == "wav":
+        wav_path = path or audio_cfg.get("replay_path")
+        if not wav_path:
+            raise ValueError("audio source 'wav' needs audio.replay_path or --wav")
+        replay_speed = parse_speed(speed if speed is not None else audio_cfg.get("replay_speed", 1.0))
+        return WavReplaySource(wav_path, chunk_ms=chunk_ms, speed=replay_speed, **queue_opts)
+
+    raise ValueError(f"Unknown audio source {kind!r} (expected 'loopback' or 'wav')")
+
+
+def capture_stream(q: Queue, stop_flag):
+    """
+    Continuous capture from the source configured in config/settings.yaml
+    (WASAPI loopback by default) and push int16 numpy arrays to q.
+    """
+    cfg_audio = yaml.safe_load(open("config/settings.yaml"))["audio"]
+    source = make_source(cfg_audio)
+    source.run(q, stop_flag)
+    print(source.stats.summary())
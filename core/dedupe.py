@@ -0,0 +1,206 @@
+# core/dedupe.py
+
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+# Tokens that show up in nearly every question; they go last in the
+# near-containment prefix order so their (long) posting lists are rarely read.
+COMMON_TOKENS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "at", "about",
+    "you", "your", "i", "me", "my", "we", "it", "that", "this",
+    "what", "how", "why", "when", "where", "who", "can", "could", "would", "do", "did",
+    "does", "is", "are", "was", "were", "have", "has", "tell",
+}
+
+GRAM = 3
+
+
+def _grams(s: str) -> Set[str]:
+    return {s[i:i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+
+def _token_order(tok: str):
+    return (tok in COMMON_TOKENS, hash(tok))
+
+
+class DedupeIndex:
+    """
+    Bounded store of normalized question strings that answers "is this a
+    duplicate?" without scanning every entry.
+
+    A string is a duplicate when it is contained in a stored string or
+    contains one (the check QuestionFinder always did). Both directions go
+    through a character 3-gram index:
+      - query inside an entry: every gram of the query must occur in the
+        entry, so only entries listed under all of the query's rarest grams
+        are checked with `in`;
+      - entry inside the query: each entry is filed under one anchor gram
+        (its rarest when added), and only entries anchored at one of the
+        query's grams are checked.
+
+    With `near_threshold` (e.g. 0.8) a string is also a duplicate when the
+    word overlap covers that fraction of the shorter of the two (strings of
+    at least `near_min_tokens` words). Candidates come from a prefix filter
+    over a fixed token order, so only entries sharing one of the query's
+    rarer words are compared.
+
+    Memory is bounded: past `capacity` entries, or once entries are older
+    than `max_age_s`, the oldest are evicted.
+
+    Usage:
+        seen = DedupeIndex(capacity=5000)
+        if not seen.contains(norm):
+            seen.add(norm)
+    """
+
+    def __init__(self, capacity: int = 5000, max_age_s: Optional[float] = None,
+                 near_threshold: Optional[float] = None, near_min_tokens: int = 5):
+        self.capacity = int(capacity)
+        self.max_age_s = max_age_s
+        self.near_threshold = near_threshold
+        self.near_min_tokens = int(near_min_tokens)
+        self.evicted = 0
+
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (text, added_at), oldest first
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._postings: Dict[str, Set[int]] = {}      # gram -> ids containing it
+        self._anchored: Dict[str, Set[int]] = {}      # anchor gram -> ids
+        self._anchor: Dict[int, str] = {}
+        self._short: Set[int] = set()                 # entries shorter than one gram
+        self._token_postings: Dict[str, Set[int]] = {}
+        self._token_prefix: Dict[int, List[str]] = {}
+
+        if self.near_threshold is not None:
+            # least overlap two near-duplicates can have; sets the prefix lengths
+            self._min_overlap = max(1, math.ceil(self.near_threshold * self.near_min_tokens))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return (text for text, _ in self._entries.values())
+
+    def __contains__(self, s: str) -> bool:
+        return s in self._ids
+
+    # ---------- queries ----------
+
+    def contains(self, s: str) -> bool:
+        """True if `s` duplicates a stored string (see class docstring)."""
+        self._expire()
+        if not s:
+            return False
+        if s in self._ids:
+            return True
+        if self._inside_entry(s) or self._entry_inside(s):
+            return True
+        return self.near_threshold is not None and self._near(s)
+
+    def _inside_entry(self, s: str) -> bool:
+        if len(s) < GRAM:
+            return any(s in text for text, _ in self._entries.values())
+        lists = []
+        for g in _grams(s):
+            ids = self._postings.get(g)
+            if not ids:
+                return False  # some gram of s occurs in no entry
+            lists.append(ids)
+        # candidates must hold every gram; intersecting the rarest few is cheap and cuts most
+        lists.sort(key=len)
+        candidates = lists[0].intersection(*lists[1:4])
+        return any(s in self._entries[i][0] for i in candidates)
+
+    def _entry_inside(self, s: str) -> bool:
+        if any(self._entries[i][0] in s for i in self._short):
+            return True
+        for g in _grams(s):
+            for i in self._anchored.get(g, ()):
+                if self._entries[i][0] in s:
+                    return True
+        return False
+
+    def _near(self, s: str) -> bool:
+        toks = set(s.split())
+        if len(toks) < self.near_min_tokens:
+            return False
+        candidates: Set[int] = set()
+        for tok in self._prefix(toks):
+            candidates |= self._token_postings.get(tok, set())
+        for i in candidates:
+            other = set(self._entries[i][0].split())
+            if len(toks & other) >= self.near_threshold * min(len(toks), len(other)):
+                return True
+        return False
+
+    def _prefix(self, toks: Set[str]) -> List[str]:
+        ordered = sorted(toks, key=_token_order)
+        return ordered[:len(ordered) - self._min_overlap + 1]
+
+    # ---------- updates ----------
+
+    def add(self, s: str) -> None:
+        if not s or s in self._ids:
+            return
+        i = self._next_id
+        self._next_id += 1
+        self._entries[i] = (s, time.monotonic())
+        self._ids[s] = i
+
+        grams = _grams(s)
+        for g in grams:
+            self._postings.setdefault(g, set()).add(i)
+        if grams:
+            anchor = min(grams, key=lambda g: len(self._anchored.get(g, ())))
+            self._anchored.setdefault(anchor, set()).add(i)
+            self._anchor[i] = anchor
+        else:
+            self._short.add(i)
+
+        if self.near_threshold is not None:
+            toks = set(s.split())
+            if len(toks) >= self.near_min_tokens:
+                prefix = self._prefix(toks)
+                for tok in prefix:
+                    self._token_postings.setdefault(tok, set()).add(i)
+                self._token_prefix[i] = prefix
+
+        while len(self._entries) > self.capacity:
+            self._evict_oldest()
+
+    def _expire(self) -> None:
+        if self.max_age_s is None:
+            return
+        cutoff = time.monotonic() - self.max_age_s
+        while self._entries and next(iter(self._entries.values()))[1] < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        i, (s, _) = self._entries.popitem(last=False)
+        del self._ids[s]
+        for g in _grams(s):
+            ids = self._postings[g]
+            ids.discard(i)
+            if not ids:
+                del self._postings[g]
+        anchor = self._anchor.pop(i, None)
+        if anchor is not None:
+            ids = self._anchored[anchor]
+            ids.discard(i)
+            if not ids:
+                del self._anchored[anchor]
+        self._short.discard(i)
+        for tok in self._token_prefix.pop(i, ()):
+            ids = self._token_postings[tok]
+            ids.discard(i)
+            if not ids:
+                del self._token_postings[tok]
+        self.evicted += 1
+
+    def clear(self) -> None:
+        evicted = self.evicted
+        while self._entries:
+            self._evict_oldest()
+        self.evicted = evicted
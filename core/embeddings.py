@@ -0,0 +1,254 @@
+# core/embeddings.py
+
+import os
+import re
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# texts -> one vector per text (e.g. core.llm.ollama_client.embed with the model/URL bound)
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def content_key(model: str, text: str) -> str:
+    """Cache key of `text` embedded with `model`."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk cache of embedding vectors keyed by content hash, so a text is
+    embedded once and every later run (or repeated query) reads it back.
+
+    Each model gets its own directory under `cache_dir` with keys.txt (one
+    sha256 key per line) and vectors.f32 (float32 rows in the same order).
+    New vectors are appended to both in batches; rows without a key (an
+    interrupted append) are cut off on load. In memory the rows live in a
+    buffer that doubles when full, so appends don't copy the whole matrix.
+
+    Queries (live questions, each asked once or twice) go through
+    get_query() instead: they are not written to disk, only kept in a small
+    in-memory LRU of `query_cache_size` vectors.
+
+    Usage:
+        cache = EmbeddingCache("data/embedding_cache", "nomic-embed-text", embed_fn)
+        vectors = cache.get_many(["how do you monitor drift", ...])   # (n, dim) float32
+        q = cache.get_query("how would you watch for drift?")
+        print(cache.summary())
+    """
+
+    def __init__(self, cache_dir: str, model: str, embed_fn: EmbedFn, batch_size: int = 32,
+                 query_cache_size: int = 256):
+        self.model = model
+        self.embed_fn = embed_fn
+        self.batch_size = int(batch_size)
+        self.dir = os.path.join(cache_dir, _UNSAFE.sub("_", model))
+        self.hits = 0
+        self.misses = 0
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._buf = np.zeros((0, 0), dtype=np.float32)   # rows [0, len(self)) are in use
+        self.query_cache_size = int(query_cache_size)
+        self._queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._load()
+
+    @property
+    def _keys_path(self) -> str:
+        return os.path.join(self.dir, "keys.txt")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.dir, "vectors.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.dir, "meta.json")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def _vectors(self) -> np.ndarray:
+        return self._buf[:len(self._rows)]
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            self.dim = int(json.load(f)["dim"])
+        with open(self._keys_path, "r", encoding="utf-8") as f:
+            keys = [line.strip() for line in f if line.strip()]
+        vectors = np.fromfile(self._vectors_path, dtype=np.float32)
+        n = min(len(keys), len(vectors) // self.dim)
+        if n < len(keys) or n * self.dim < len(vectors):
+            # interrupted append: keep the rows that have both a key and a full vector
+            keys = keys[:n]
+            with open(self._keys_path, "w", encoding="utf-8") as f:
+                f.writelines(k + "\n" for k in keys)
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(n * self.dim * 4)
+        self._buf = vectors[:n * self.dim].reshape(n, self.dim)
+        self._rows = {k: i for i, k in enumerate(keys)}
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "dim": self.dim}, f)
+        # vectors first: a key is only written once its row is on disk
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._keys_path, "a", encoding="utf-8") as f:
+            f.writelines(k + "\n" for k in keys)
+        start = len(self._rows)
+        if start + len(vectors) > len(self._buf):
+            buf = np.empty((max(2 * len(self._buf), start + len(vectors), 64), self.dim), dtype=np.float32)
+            if start:
+                buf[:start] = self._buf[:start]
+            self._buf = buf
+        self._buf[start:start + len(vectors)] = vectors
+        for i, k in enumerate(keys):
+            self._rows[k] = start + i
+
+    def get_many(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 vectors; only texts not in the cache are sent to `embed_fn`."""
+        keys = [content_key(self.model, t) for t in texts]
+        missing: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in self._rows and k not in missing:
+                missing[k] = t
+        # a question asked live and then added to the bank was already embedded as a query
+        promoted = [k for k in missing if k in self._queries]
+        if promoted:
+            self._append(promoted, np.stack([self._queries.pop(k) for k in promoted]))
+            for k in promoted:
+                del missing[k]
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        todo = list(missing.items())
+        for i in range(0, len(todo), self.batch_size):
+            batch = todo[i:i + self.batch_size]
+            vectors = np.asarray(self.embed_fn([t for _, t in batch]), dtype=np.float32)
+            if self.dim is not None and vectors.shape[1] != self.dim:
+                raise ValueError(f"{self.model}: got {vectors.shape[1]}-dim vectors, cache holds {self.dim}-dim")
+            self._append([k for k, _ in batch], vectors)
+
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._vectors[[self._rows[k] for k in keys]]
+
+    def get(self, text: str) -> np.ndarray:
+        return self.get_many([text])[0]
+
+    def get_query(self, text: str) -> np.ndarray:
+        """Vector of a query: from the disk cache if it's there, else embedded and kept in the in-memory LRU only."""
+        key = content_key(self.model, text)
+        if key in self._rows:
+            self.hits += 1
+            return self._buf[self._rows[key]]
+        vector = self._queries.get(key)
+        if vector is not None:
+            self._queries.move_to_end(key)
+            self.hits += 1
+            return vector
+        self.misses += 1
+        vector = np.asarray(self.embed_fn([text]), dtype=np.float32)[0]
+        if self.dim is not None and vector.shape[0] != self.dim:
+            raise ValueError(f"{self.model}: got {vector.shape[0]}-dim vectors, cache holds {self.dim}-dim")
+        self._queries[key] = vector
+        if len(self._queries) > self.query_cache_size:
+            self._queries.popitem(last=False)
+        return vector
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (f"[STATS] embedding cache ({self.model}): {len(self)} vectors, "
+                f"{self.hits} hits / {self.misses} misses ({self.hit_rate() * 100:.0f}% hit rate)")
+
+
+class SemanticIndex:
+    """
+    Cosine top-k over embedded texts: one matrix-vector product over the
+    L2-normalized vectors and an argpartition. add() appends texts into a
+    buffer that doubles when full.
+    """
+
+    def __init__(self, texts: List[str], cache: EmbeddingCache):
+        self.cache = cache
+        self._buf = _normalize(cache.get_many(texts))
+        self._n = len(self._buf)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._buf[:self._n]
+
+    def add(self, texts: List[str]) -> None:
+        if not texts:
+            return
+        vectors = _normalize(self.cache.get_many(texts))
+        n = self._n + len(vectors)
+        if n > len(self._buf) or self._buf.shape[1] != vectors.shape[1]:
+            buf = np.empty((max(2 * len(self._buf), n, 64), vectors.shape[1]), dtype=np.float32)
+            if self._n:
+                buf[:self._n] = self._buf[:self._n]
+            self._buf = buf
+        self._buf[self._n:n] = vectors
+        self._n = n
+
+    def top_k(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """The `k` best (row, cosine) pairs, best first."""
+        if len(self.matrix) == 0:
+            return []
+        scores = self.matrix @ _normalize(self.cache.get_query(query)[None, :])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.maximum(norms, 1e-12)
+
+
+class SemanticRetriever:
+    """
+    Embedding-based lookup over an AnswerRetriever's answer bank, for
+    paraphrased questions the lexical index misses. All bank questions are
+    embedded once (through the cache, so only new entries cost an
+    embedding call); sync() embeds entries added to the bank since
+    (AnswerRetriever.add()).
+
+    Usage:
+        sem = SemanticRetriever(answer_retriever, cache)
+        found = sem.find_best(question, threshold=0.85)   # (bullets, matched_question, cosine) or None
+    """
+
+    def __init__(self, retriever, cache: EmbeddingCache):
+        self.retriever = retriever
+        self.index = SemanticIndex([retriever.question(i) for i in range(len(retriever))], cache)
+
+    def find_best(self, question: str, threshold: float = 0.85) -> Optional[Tuple[List[str], str, float]]:
+        top = self.index.top_k(question.strip(), k=1)
+        if not top or top[0][1] < threshold:
+            return None
+        i, score = top[0]
+        entry = self.retriever.entry(i)
+        return entry.get("bullets", []), entry.get("question", ""), score
+
+    def sync(self) -> None:
+        """Embed the bank entries added since the index was built or last synced."""
+        self.index.add([self.retriever.question(i) for i in range(len(self.index), len(self.retriever))])
@@ -0,0 +1,234 @@
+# core/intent.py
+
+import re
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from core.text_match import trie_regex
+
+# A rule fires when every group has at least one of its literals in the
+# lowercased question (plain substring test, like `p in q`).
+Groups = Sequence[Sequence[str]]
+
+# Question intent: first matching rule wins, "generic" if none does.
+INTENT_RULES: List[Tuple[str, Groups]] = [
+    ("intro", [["tell me about yourself", "introduce yourself", "who are you"]]),
+    ("education", [["what have you studied", "education", "background"]]),
+    ("experience", [["experience"], ["what has been your"]]),
+    ("strengths", [["strength"]]),
+    ("weaknesses", [["weakness", "development areas", "improvement areas"]]),
+    # LLM basics
+    ("llm_basics", [[
+        "what is an llm",
+        "what is a large language model",
+        "how do llms work",
+        "generative ai",
+        "foundation model",
+        "what is gpt",
+        "what are transformers",
+    ]]),
+    # ML pipeline / productionization
+    ("ml_pipeline", [[
+        "ml pipeline",
+        "machine learning pipeline",
+        "end to end pipeline",
+        "end-to-end pipeline",
+        "ml workflow",
+        "machine learning workflow",
+        "productionize",
+        "productionalize",
+        "deploy a model",
+        "model deployment steps",
+        "model training pipeline",
+        "feature pipeline",
+    ]]),
+    ("why_company", [[
+        "why do you want to work here",
+        "why do you want to work for",
+        "why are you interviewing with me today",
+        "why are you interviewing with us",
+        "what made you apply for this job",
+        "what made you apply",
+        "why this job",
+        "why this company",
+        "why do you want to join",
+        "why do you want this role",
+        "why are you interested in this position",
+        "why should we hire you",
+        "why should we give this job to you",
+        "why should we hire you and not someone else",
+    ]]),
+    # Behavioral / STAR-style project questions
+    ("behavioral_project", [[
+        "tell me about a time",
+        "give me an example",
+        "describe a time",
+        "describe a situation",
+        "situation where",
+        "project where",
+        "project when",
+        "time when you",
+        "time when you were",
+        "handled a",
+        "faced a",
+        "dealt with",
+        "how did you handle",
+        "how did you meet the deadline",
+        "with a deadline",
+        "in charge of a project",
+    ]]),
+    # Generic "tell me about a project" -> treat as behavioral_project
+    ("behavioral_project", [["project"], [
+        "end-to-end",
+        "end to end",
+        "mlops",
+        "devops",
+        "specific project you worked on",
+        "project you worked on",
+        "end-to-end mlops",
+        "end-to-end devops",
+        "devops project",
+        "mlops project",
+        "devops project you worked on",
+        "mlops project you worked on",
+        "devops pipeline you worked on",
+        "mlops pipeline you worked on",
+    ]]),
+]
+
+DEFAULT_INTENT = "generic"
+
+# Behavioral tags (used to pick a project for STAR answers): every matching rule adds its tags.
+TAG_RULES: List[Tuple[Tuple[str, ...], Groups]] = [
+    # DEADLINE / PRESSURE / OWNERSHIP
+    (("deadline",), [["deadline", "time pressure", "tight schedule", "deliver on time"]]),
+    (("leadership", "ownership"), [["in charge", "led", "leadership", "owned", "owner", "drove"]]),
+    # COST / OPTIMIZATION / EFFICIENCY
+    (("cost", "analysis"), [["cost", "budget", "optimiz", "expense", "saving", "save money"]]),
+    # RELIABILITY / INCIDENT / DR
+    (("incident", "reliability", "risk"), [["incident", "outage", "downtime", "reliability", "dr", "disaster"]]),
+    # COMPLIANCE / SECURITY
+    (("compliance", "audit", "security"), [["compliance", "audit", "soc2", "security", "controls", "governance"]]),
+    # MLOps / DATA / REALTIME
+    (("mlops",), [["mlops", "model", "training", "deploying models", "prediction"]]),
+    (("realtime", "sensor_data"), [["real-time", "realtime", "stream", "sensor", "modbus", "iot"]]),
+    (("data_ingestion", "data_processing"), [["pipeline", "data", "ingestion", "processing"]]),
+]
+
+# Only when no TAG_RULES matched: a generic "tell me about a project" question.
+FALLBACK_TAG_RULE: Tuple[Tuple[str, ...], Groups] = (
+    ("ownership", "deadline"), [["project", "situation", "example", "experience"]],
+)
+
+
+class IntentClassifier:
+    """
+    Question intent and behavioral tags from one pass over the question.
+
+    All literals of the rule tables go into one prefix-factored regex
+    (text_match.trie_regex) inside a lookahead, so a single findall() over
+    the lowercased question reports the longest literal starting at every
+    position. Each literal maps to a bitmask of the rule groups it
+    satisfies (including the groups of shorter literals that are its
+    prefixes), so the rules are then evaluated as integer mask tests.
+    Matching is a plain substring test, exactly like the
+    `any(p in q for p in [...])` checks the tables came from.
+
+    Usage:
+        clf = IntentClassifier()
+        intent, tags = clf.classify("Tell me about a time you missed a deadline")
+        # ("behavioral_project", ["deadline"])
+    """
+
+    def __init__(self, intent_rules=INTENT_RULES, tag_rules=TAG_RULES, fallback_tag_rule=FALLBACK_TAG_RULE,
+                 default_intent: str = DEFAULT_INTENT):
+        self.default_intent = default_intent
+        group_bits: Dict[str, int] = {}   # literal -> bits of the rule groups containing it
+        next_bit = 0
+
+        def compile_rule(groups: Groups) -> int:
+            nonlocal next_bit
+            mask = 0
+            for group in groups:
+                bit = 1 << next_bit
+                next_bit += 1
+                mask |= bit
+                for lit in group:
+                    group_bits[lit] = group_bits.get(lit, 0) | bit
+            return mask
+
+        self.intent_rules = [(intent, compile_rule(groups)) for intent, groups in intent_rules]
+        self.tag_rules = [(tuple(tags), compile_rule(groups)) for tags, groups in tag_rules]
+        tags, groups = fallback_tag_rule
+        self.fallback_tag_rule = (tuple(tags), compile_rule(groups))
+
+        literals = sorted(lit for lit in group_bits if lit)
+        self.regex = re.compile("(?=(" + trie_regex(literals) + "))")
+        # the regex reports the longest literal at a position; the shorter ones there are its prefixes
+        self._bits = {
+            lit: reduce(or_, (group_bits[p] for p in literals if lit.startswith(p)), 0) for lit in literals
+        }
+
+    def _mask(self, question: str) -> int:
+        bits = self._bits
+        return reduce(or_, [bits[lit] for lit in set(self.regex.findall(question.lower()))], 0)
+
+    def _intent(self, mask: int) -> str:
+        for intent, rule in self.intent_rules:
+            if mask & rule == rule:
+                return intent
+        return self.default_intent
+
+    def _tags(self, mask: int) -> List[str]:
+        tags: List[str] = []
+        for rule_tags, rule in self.tag_rules:
+            if mask & rule == rule:
+                tags.extend(rule_tags)
+        if not tags:
+            fallback_tags, rule = self.fallback_tag_rule
+            if mask & rule == rule:
+                tags.extend(fallback_tags)
+        return list(dict.fromkeys(tags))  # deduplicate, keep order
+
+    def classify(self, question: str) -> Tuple[str, List[str]]:
+        """(intent, behavioral tags) for one question."""
+        mask = self._mask(question)
+        return self._intent(mask), self._tags(mask)
+
+    def intent(self, question: str) -> str:
+        return self._intent(self._mask(question))
+
+    def behavior_tags(self, question: str) -> List[str]:
+        return self._tags(self._mask(question))
+
+    def classify_many(self, questions: Iterable[str]) -> List[Tuple[str, List[str]]]:
+        """classify() for a batch (e.g. a whole answer bank); repeated questions are classified once."""
+        cache: Dict[str, Tuple[str, List[str]]] = {}
+        out = []
+        for q in questions:
+            key = q.lower()
+            if key not in cache:
+                cache[key] = self.classify(key)
+            intent, tags = cache[key]
+            out.append((intent, list(tags)))
+        return out
+
+
+_default = IntentClassifier()
+
+
+def classify(question: str) -> Tuple[str, List[str]]:
+    return _default.classify(question)
+
+
+def classify_many(questions: Iterable[str]) -> List[Tuple[str, List[str]]]:
+    return _default.classify_many(questions)
+
+
+def classify_intent(question: str) -> str:
+    return _default.intent(question)
+
+
+def classify_behavior_tags(question: str) -> List[str]:
+    return _default.behavior_tags(question)
@@ -24,3 +24,22 @@ def generate_answer(system_prompt: str, user_message: str) -> str:
     resp.raise_for_status()
     data = resp.json()
     return data["message"]["content"]
+
+
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
+EMBED_MODEL_NAME = "nomic-embed-text"  # any embedding model pulled into Ollama
+
+
+def embed(texts: list, model: str = EMBED_MODEL_NAME, url: str = OLLAMA_EMBED_URL,
+          timeout: float = 60) -> list:
+    """
+    Embed each text with the local Ollama embeddings API (one request per
+    text, over one HTTP session). Returns a list of float lists.
+    """
+    out = []
+    with requests.Session() as session:
+        for text in texts:
+            resp = session.post(url, json={"model": model, "prompt": text}, timeout=timeout)
+            resp.raise_for_status()
+            out.append(resp.json()["embedding"])
+    return out
@@ -0,0 +1,108 @@
+# core/metrics.py
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+
+class BusyIdleTimer:
+    """
+    Accumulates how long a worker loop spends blocked (idle) vs doing work (busy).
+
+    Usage:
+        timer = BusyIdleTimer("consumer")
+        with timer.idle():
+            item = q.get()
+        with timer.busy():
+            handle(item)
+        print(timer.summary())
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy_s = 0.0
+        self.idle_s = 0.0
+
+    @contextmanager
+    def busy(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy_s += time.perf_counter() - t0
+
+    @contextmanager
+    def idle(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.idle_s += time.perf_counter() - t0
+
+    def busy_fraction(self) -> float:
+        total = self.busy_s + self.idle_s
+        return self.busy_s / total if total > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"[STATS] {self.name}: busy {self.busy_s:.1f}s, idle {self.idle_s:.1f}s "
+                f"({self.busy_fraction() * 100:.0f}% busy)")
+
+
+class LatencyTracker:
+    """
+    Latency from a reference event to a later one, e.g. "interviewer stopped
+    talking" -> "question emitted".
+
+    mark() sets the reference time, reset() clears it (e.g. speech resumed),
+    observe() records the time since the last mark. Events observed with no
+    mark set are only counted (`unmatched`). The last `keep` samples are kept
+    for percentiles.
+
+    Usage:
+        lat = LatencyTracker("speech end -> question")
+        lat.mark()          # audio stage, segment closed
+        lat.observe()       # question stage, question found
+        print(lat.summary())
+    """
+
+    def __init__(self, name: str, keep: int = 1000):
+        self.name = name
+        self.samples = deque(maxlen=keep)
+        self.unmatched = 0
+        self._ref: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def mark(self, t: Optional[float] = None) -> None:
+        with self._lock:
+            self._ref = time.perf_counter() if t is None else t
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ref = None
+
+    def observe(self, t: Optional[float] = None) -> Optional[float]:
+        """Record the latency since the last mark; returns it (None if nothing was marked)."""
+        t = time.perf_counter() if t is None else t
+        with self._lock:
+            if self._ref is None:
+                self.unmatched += 1
+                return None
+            latency = max(0.0, t - self._ref)
+            self.samples.append(latency)
+            return latency
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+    def summary(self) -> str:
+        if not self.samples:
+            return f"[STATS] {self.name}: no samples ({self.unmatched} unmatched)"
+        mean = sum(self.samples) / len(self.samples)
+        return (f"[STATS] {self.name}: n={len(self.samples)}, mean {mean:.2f}s, "
+                f"p50 {self.percentile(50):.2f}s, p90 {self.percentile(90):.2f}s, "
+                f"max {max(self.samples):.2f}s ({self.unmatched} before speech ended)")
@@ -0,0 +1,145 @@
+# core/near_dup.py
+
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Words that carry no meaning for "is this the same question?"; dropped before shingling
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "at", "about",
+    "you", "your", "i", "me", "my", "we", "us", "it", "that", "this", "so",
+    "can", "could", "would", "will", "do", "did", "does", "is", "are", "was", "were", "be", "been",
+    "have", "has", "had", "please", "just", "like", "um", "uh", "okay", "ok", "well", "right", "tell",
+}
+
+# common ASR spellings -> one form
+ALIASES = {"thru": "through", "u": "you", "ur": "your", "gonna": "going", "wanna": "want"}
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_PRIME = (1 << 31) - 1  # shingle hashes are reduced below this, so a * x + b fits in uint64
+
+
+def normalize(text: str) -> str:
+    """Lowercase, punctuation off, ASR aliases folded, stopwords dropped."""
+    words = (ALIASES.get(w, w) for w in _NON_WORD.sub(" ", text.lower()).split())
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """Character k-grams of the normalized text (the whole text if it is shorter than k)."""
+    s = normalize(text)
+    if len(s) <= k:
+        return {s} if s else set()
+    return {s[i:i + k] for i in range(len(s) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH S-curve midpoint,
+    (1 / bands) ** (1 / rows), sits a little below `threshold`, so pairs at
+    the threshold are very likely to share a bucket.
+    """
+    target = 0.85 * threshold
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - target))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index over normalized questions.
+
+    Each question becomes a set of character shingles (after dropping
+    stopwords and folding ASR spellings like "thru"), summarized by a
+    `num_perm`-value MinHash signature. The signature is cut into bands and
+    every band is a hash-bucket key, so a lookup only compares against
+    questions sharing at least one bucket; the cost doesn't depend on how
+    many questions are stored. Candidates are confirmed with the exact
+    shingle Jaccard similarity against `threshold`.
+
+    Every entry carries a payload (the answer, for AnswerEngine). The oldest
+    entries are dropped past `capacity`.
+
+    Usage:
+        idx = NearDuplicateIndex(threshold=0.6)
+        hit = idx.find(question)           # (earlier_question, payload, similarity) or None
+        if hit is None:
+            idx.add(question, answer)
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: Optional[int] = None,
+                 shingle_k: int = 3, capacity: int = 1000, seed: int = 1):
+        self.threshold = float(threshold)
+        self.num_perm = int(num_perm)
+        if bands is None:
+            self.bands, self.rows = choose_bands(self.num_perm, self.threshold)
+        else:
+            if self.num_perm % bands:
+                raise ValueError(f"bands ({bands}) must divide num_perm ({self.num_perm})")
+            self.bands, self.rows = int(bands), self.num_perm // int(bands)
+        self.shingle_k = int(shingle_k)
+        self.capacity = int(capacity)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=self.num_perm, dtype=np.uint64)
+
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (text, shingles, keys, payload)
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(self.bands)]
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, sh: Set[str]) -> np.ndarray:
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in sh), dtype=np.uint64, count=len(sh))
+        return ((np.outer(x, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def find(self, text: str) -> Optional[Tuple[str, Any, float]]:
+        """Most similar stored question at or above the threshold, as (text, payload, similarity)."""
+        sh = shingles(text, self.shingle_k)
+        if not sh or not self._entries:
+            return None
+        candidates: Set[int] = set()
+        for band, key in zip(self._buckets, self._band_keys(self.signature(sh))):
+            candidates |= band.get(key, set())
+
+        best = None
+        for i in candidates:
+            stored_text, stored_sh, _, payload = self._entries[i]
+            sim = jaccard(sh, stored_sh)
+            if sim >= self.threshold and (best is None or sim > best[2]):
+                best = (stored_text, payload, sim)
+        return best
+
+    def add(self, text: str, payload: Any = None) -> None:
+        sh = shingles(text, self.shingle_k)
+        if not sh:
+            return
+        i = self._next_id
+        self._next_id += 1
+        keys = self._band_keys(self.signature(sh))
+        for band, key in zip(self._buckets, keys):
+            band.setdefault(key, set()).add(i)
+        self._entries[i] = (text, sh, keys, payload)
+        while len(self._entries) > self.capacity:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        i, (_, _, keys, _) = self._entries.popitem(last=False)
+        for band, key in zip(self._buckets, keys):
+            ids = band[key]
+            ids.discard(i)
+            if not ids:
+                del band[key]
@@ -0,0 +1,417 @@
+# core/pipeline.py
+
+import time
+import threading
+from dataclasses import dataclass
+from queue import Queue, Full, Empty
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from core.metrics import BusyIdleTimer, LatencyTracker
+from core.question_finder import QuestionFinder
+from core.stt_whisper_stream import (
+    SAMPLE_RATE, CatchUpMonitor, QuestionConfirmer, StreamPreprocessor, StreamingTranscriber,
+    transcribe_segments,
+)
+from core.vad import FrameVAD
+
+QUEUE_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# end-of-stream marker passed down the stage chain
+EOS = object()
+# STT -> question stage: the text of an end-of-utterance block has been committed
+UTTERANCE_END = object()
+
+
+class StageQueue(Queue):
+    """
+    Bounded queue between two pipeline stages.
+
+    offer() applies the queue's backpressure policy:
+        block        wait for room (upstream slows down to the consumer's pace)
+        drop_oldest  discard the oldest queued item
+        drop_newest  discard the incoming item
+    Depth high-water mark, puts and drops are tracked for reporting. Plain
+    Queue methods still work (capture sources use them directly).
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = "block"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"{name}: policy must be one of {QUEUE_POLICIES}, got {policy!r}")
+        super().__init__(maxsize=maxsize)
+        self.name = name
+        self.policy = policy
+        self.high_water = 0
+        self.puts = 0
+        self.dropped = 0
+
+    def _put(self, item):
+        # called by Queue with its lock held
+        super()._put(item)
+        self.puts += 1
+        self.high_water = max(self.high_water, self._qsize())
+
+    def offer(self, item) -> bool:
+        """Put under the backpressure policy. Returns False if `item` itself was dropped."""
+        if self.policy == "block":
+            self.put(item)
+            return True
+        try:
+            self.put_nowait(item)
+            return True
+        except Full:
+            pass
+        self.dropped += 1
+        if self.policy == "drop_newest":
+            return False
+        try:
+            self.get_nowait()
+        except Empty:
+            pass
+        try:
+            self.put_nowait(item)
+            return True
+        except Full:
+            return False
+
+    def put_eos(self) -> None:
+        self.put(EOS)  # never dropped
+
+    def summary(self) -> str:
+        return (f"[STATS] queue {self.name}: depth {self.qsize()}/{self.maxsize}, "
+                f"high-water {self.high_water}, puts {self.puts}, dropped {self.dropped} ({self.policy})")
+
+
+class Stage(threading.Thread):
+    """
+    Worker thread: takes items from `inbox`, runs handler.process(item) and
+    offers every returned item to `outbox`.
+
+    On EOS (or, for the first stage, once `upstream_done` is set and the inbox
+    is empty) it calls handler.finish(), forwards its output and EOS, and exits.
+    Handler errors are printed and the item is skipped.
+    """
+
+    def __init__(self, name: str, handler, inbox: Queue, outbox: Optional[StageQueue] = None,
+                 upstream_done: Optional[threading.Event] = None):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.upstream_done = upstream_done
+        self.timer = BusyIdleTimer(name)
+
+    def _next(self):
+        while True:
+            try:
+                # timeout keeps us responsive to upstream_done
+                return self.inbox.get(timeout=0.5)
+            except Empty:
+                if self.upstream_done is not None and self.upstream_done.is_set() and self.inbox.empty():
+                    return EOS
+
+    def _forward(self, items) -> None:
+        if self.outbox is None or not items:
+            return
+        for item in items:
+            self.outbox.offer(item)
+
+    def run(self) -> None:
+        while True:
+            with self.timer.idle():
+                item = self._next()
+            if item is EOS:
+                break
+            with self.timer.busy():
+                try:
+                    out = self.handler.process(item)
+                except Exception as e:
+                    print(f"[ERROR] {self.name} stage failed: {e}")
+                    continue
+            self._forward(out)
+
+        finish = getattr(self.handler, "finish", None)
+        if finish is not None:
+            with self.timer.busy():
+                try:
+                    self._forward(finish())
+                except Exception as e:
+                    print(f"[ERROR] {self.name} stage failed while finishing: {e}")
+        if self.outbox is not None:
+            self.outbox.put_eos()
+
+
+# ---------- stage handlers ----------
+
+@dataclass
+class AudioBlock:
+    """16 kHz mono audio handed from the audio stage to STT."""
+    start_s: float
+    samples: np.ndarray
+    speech: bool
+    end_of_utterance: bool = False  # the VAD closed a speech segment; commit everything so far
+
+
+class AudioHandler:
+    """
+    Capture chunks -> VAD + 16 kHz preprocessing -> AudioBlocks.
+
+    Incremental mode emits one block per step; window mode emits a
+    peak-normalized full window every step.
+
+    With `end_of_utterance` (incremental mode), a speech segment closed by
+    the VAD (after its `end_silence_ms` of quiet) doesn't wait for the next
+    step: the audio buffered so far goes out at once as a short block
+    flagged end_of_utterance. `latency`, if given, is marked with the
+    (estimated wall-clock) time each segment's speech ended and reset when
+    speech starts again.
+    """
+
+    def __init__(self, pre: StreamPreprocessor, vad: FrameVAD, window_s: int, step_s: int,
+                 incremental: bool, release: Optional[Callable] = None,
+                 end_of_utterance: bool = False, latency: Optional[LatencyTracker] = None):
+        self.pre = pre
+        self.vad = vad
+        self.window_s = window_s
+        self.step_s = step_s
+        self.incremental = incremental
+        self.release = release
+        self.end_of_utterance = end_of_utterance and incremental
+        self.latency = latency
+        self.window_samples = SAMPLE_RATE * window_s
+        self.step_samples = SAMPLE_RATE * step_s
+        self._was_speaking = False
+
+    def process(self, chunk: np.ndarray) -> List[AudioBlock]:
+        self.vad.feed(chunk)
+        self.pre.feed(chunk)
+        if self.release is not None:
+            self.release(chunk)
+        segments = self.vad.pop_segments()
+        self._track_speech(segments)
+
+        ring = self.pre.ring
+        needed = self.step_samples if self.incremental else self.window_samples
+        blocks = []
+        while ring.available() >= needed:
+            t0 = ring.read_pos / SAMPLE_RATE
+            if self.incremental:
+                samples = ring.window(self.step_samples).copy()
+                speech = self.vad.is_speech_between(t0, t0 + self.step_s)
+            else:
+                samples = self.pre.normalized_window(self.window_samples).copy()
+                speech = self.vad.is_speech_between(t0, t0 + self.window_s)
+            blocks.append(AudioBlock(t0, samples, speech))
+            ring.advance(self.step_samples)
+
+        if segments and self.end_of_utterance:
+            n = ring.available()
+            if n:
+                t0 = ring.read_pos / SAMPLE_RATE
+                blocks.append(AudioBlock(t0, ring.window(n).copy(), True, end_of_utterance=True))
+                ring.advance(n)
+            elif blocks:
+                blocks[-1].end_of_utterance = True
+            else:
+                blocks.append(AudioBlock(ring.read_pos / SAMPLE_RATE, np.zeros(0, dtype=np.float32),
+                                         True, end_of_utterance=True))
+        return blocks
+
+    def _track_speech(self, segments) -> None:
+        if self.latency is None:
+            return
+        if segments:
+            # the VAD is end_silence_ms (plus up to a chunk) past the end of speech
+            fed_s = self.vad.frame_to_seconds(self.vad.frames)
+            self.latency.mark(time.perf_counter() - (fed_s - segments[-1][1]))
+        if self.vad.in_speech and not self._was_speaking:
+            self.latency.reset()
+        self._was_speaking = self.vad.in_speech
+
+    def finish(self) -> List[AudioBlock]:
+        if not self.incremental:
+            return []
+        # source finished: pass on whatever is still buffered
+        self.pre.flush()
+        ring = self.pre.ring
+        n = ring.available()
+        if n == 0:
+            return []
+        t0 = ring.read_pos / SAMPLE_RATE
+        block = AudioBlock(t0, ring.window(n).copy(), True)
+        ring.advance(n)
+        return [block]
+
+
+class SttHandler:
+    """
+    AudioBlocks -> newly transcribed text (each word once in incremental mode).
+
+    With a CatchUpMonitor and the STT inbox (`backlog`), incremental mode
+    switches to catch-up when the queued audio exceeds the monitor's enter
+    threshold: blocks are only buffered while more are waiting (up to
+    `max_batch_s`), then the whole backlog is decoded in one batched call.
+    It returns to per-step decoding once the queue drains below the exit
+    threshold.
+
+    An end_of_utterance block (incremental mode) is decoded and committed in
+    full right away, and UTTERANCE_END follows its text so the question
+    stage can close the sentence.
+
+    Window mode decodes every overlapping window with word timestamps and
+    emits only words past `horizon` (the end of the last emitted word).
+    Words ending within `edge_s` of the window end may be cut off, so they
+    are left for the next window, which sees them whole.
+    """
+
+    def __init__(self, incremental: bool, transcriber: Optional[StreamingTranscriber] = None,
+                 catchup: Optional[CatchUpMonitor] = None, backlog: Optional[Queue] = None,
+                 step_s: float = 2.0, max_batch_s: float = 60.0):
+        self.incremental = incremental
+        self.transcriber = transcriber or StreamingTranscriber()
+        self.catchup = catchup if incremental else None
+        self.backlog = backlog
+        self.step_s = step_s
+        self.max_batch_s = max_batch_s
+        self.printed_text_tail = ""
+        self.horizon = 0.0
+        self.edge_s = 1.0
+        self._pending_s = 0.0  # audio inserted but not yet decoded (catch-up only)
+
+    def process(self, block: AudioBlock) -> List:
+        if self.catchup is not None and self.backlog is not None:
+            out = self._process_tracked(block)
+        else:
+            out = self._emit(self._decode_block(block))
+        if block.end_of_utterance:
+            out.append(UTTERANCE_END)
+        return out
+
+    def _decode_block(self, block: AudioBlock) -> str:
+        new_part = ""
+        if self.incremental:
+            # only the uncommitted tail is decoded; only newly stable text comes back
+            self.transcriber.insert_audio(block.samples)
+            if block.end_of_utterance:
+                # speaker stopped: no later decode is coming to agree with, commit it all now
+                new_part = self.transcriber.finish()
+            elif block.speech:
+                new_part = self.transcriber.process()
+            else:
+                new_part = self.transcriber.on_silence()
+        elif block.speech:
+            window_end = block.start_s + len(block.samples) / SAMPLE_RATE
+            segments = transcribe_segments(block.samples, block.start_s, horizon_s=self.horizon)
+            words = [w for seg in segments for w in seg.words if w.end <= window_end - self.edge_s]
+            if words:
+                self.horizon = words[-1].end
+                new_part = "".join(w.text for w in words).strip()
+        return new_part
+
+    def _process_tracked(self, block: AudioBlock) -> List[str]:
+        block_s = len(block.samples) / SAMPLE_RATE
+        waiting = self.backlog.qsize()
+        mode = self.catchup.update(waiting * self.step_s)
+
+        t0 = time.perf_counter()
+        if mode == "live" and self._pending_s == 0.0:
+            new_part = self._decode_block(block)
+        else:
+            self.transcriber.insert_audio(block.samples)
+            self._pending_s += block_s
+            if waiting and self._pending_s < self.max_batch_s and not block.end_of_utterance:
+                # more audio is already queued; decode it all in one batch later
+                self.catchup.record("catchup", block_s, time.perf_counter() - t0)
+                return []
+            new_part = self.transcriber.process_batched()
+            if block.end_of_utterance:
+                new_part = (new_part + " " + self.transcriber.finish()).strip()
+            self._pending_s = 0.0
+        self.catchup.record(mode, block_s, time.perf_counter() - t0)
+        return self._emit(new_part)
+
+    def finish(self) -> List[str]:
+        if not self.incremental:
+            return []
+        return self._emit(self.transcriber.finish())
+
+    def _emit(self, new_part: str) -> List[str]:
+        if not new_part:
+            return []
+        for line in new_part.split(". "):
+            line = line.strip()
+            if line:
+                print("🗣️", line)
+
+        self.printed_text_tail += new_part
+        if len(self.printed_text_tail) > 8000:
+            self.printed_text_tail = self.printed_text_tail[-8000:]
+        return [new_part]
+
+
+class QuestionHandler:
+    """
+    Transcript text -> newly detected questions.
+
+    UTTERANCE_END closes the finder's open sentence (QuestionFinder.finalize()).
+    Every emitted question is observed on `latency` (see AudioHandler).
+    """
+
+    def __init__(self, qfinder: Optional[QuestionFinder] = None, latency: Optional[LatencyTracker] = None):
+        self.qfinder = qfinder or QuestionFinder()
+        self.latency = latency
+
+    def process(self, item) -> List[str]:
+        if item is UTTERANCE_END:
+            questions = self.qfinder.finalize()
+        else:
+            questions = self.qfinder.process(item)
+        if self.latency is not None:
+            for _ in questions:
+                self.latency.observe()
+        return questions
+
+
+class ConfirmHandler:
+    """
+    Draft questions (from the cascade's fast model) -> questions re-decoded
+    with the main model. The draft is printed right away so the question
+    shows up before the confirmation decode finishes.
+    """
+
+    def __init__(self, confirmer: QuestionConfirmer):
+        self.confirmer = confirmer
+
+    def process(self, q_text: str) -> List[str]:
+        print(f"❔ Q (draft): {q_text}")
+        return [self.confirmer.confirm(q_text)]
+
+
+class AnswerHandler:
+    """Questions -> LLM answers, printed and appended to `qa_log`."""
+
+    def __init__(self, answer_engine, qa_log: list):
+        self.answer_engine = answer_engine
+        self.qa_log = qa_log
+
+    def process(self, q_text: str) -> List:
+        # the question goes out right away; the answer can take seconds
+        print(f"❓ Q: {q_text}")
+        bullets = self.answer_engine.generate_answer(q_text)
+        # a near-duplicate is known without an LLM call, so this line still follows the question at once
+        duplicate_of = getattr(self.answer_engine, "last_duplicate_of", None)
+        lines = [f"↩ same as earlier: {duplicate_of}"] if duplicate_of else []
+        lines += [f"➡ {b}" for b in bullets] + ["--------------------------------"]
+        print("\n".join(lines))
+        entry = {"q": q_text, "bullets": bullets}
+        if duplicate_of:
+            entry["duplicate_of"] = duplicate_of
+        self.qa_log.append(entry)
+        return []
+
+
+def make_queue(name: str, pipeline_cfg: dict, default_size: int, default_policy: str) -> StageQueue:
+    """StageQueue sized from `pipeline.<name>: {size, policy}` in settings.yaml."""
+    opts = pipeline_cfg.get(name) or {}
+    return StageQueue(name, int(opts.get("size", default_size)), opts.get("policy", default_policy))
@@ -4,6 +4,8 @@ import os
 import yaml
 from difflib import SequenceMatcher
 
+from core.intent import classify_behavior_tags  # map question text to behavioral tags
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_PROJECTS_PATH = os.path.join(HERE, "..", "data", "projects.yaml")
 
@@ -21,53 +23,6 @@ def _similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
-def classify_behavior_tags(question: str) -> list:
-    """Crude classifier: map question text to behavioral tags."""
-    q = question.lower()
-    tags = []
-
-    # DEADLINE / PRESSURE / OWNERSHIP
-    if any(w in q for w in ["deadline", "time pressure", "tight schedule", "deliver on time"]):
-        tags.append("deadline")
-    if any(w in q for w in ["in charge", "led", "leadership", "owned", "owner", "drove"]):
-        tags.append("leadership")
-        tags.append("ownership")
-
-    # COST / OPTIMIZATION / EFFICIENCY
-    if any(w in q for w in ["cost", "budget", "optimiz", "expense", "saving", "save money"]):
-        tags.append("cost")
-        tags.append("analysis")
-
-    # RELIABILITY / INCIDENT / DR
-    if any(w in q for w in ["incident", "outage", "downtime", "reliability", "dr", "disaster"]):
-        tags.append("incident")
-        tags.append("reliability")
-        tags.append("risk")
-
-    # COMPLIANCE / SECURITY
-    if any(w in q for w in ["compliance", "audit", "soc2", "security", "controls", "governance"]):
-        tags.append("compliance")
-        tags.append("audit")
-        tags.append("security")
-
-    # MLOps / DATA / REALTIME
-    if any(w in q for w in ["mlops", "model", "training", "deploying models", "prediction"]):
-        tags.append("mlops")
-    if any(w in q for w in ["real-time", "realtime", "stream", "sensor", "modbus", "iot"]):
-        tags.append("realtime")
-        tags.append("sensor_data")
-    if any(w in q for w in ["pipeline", "data", "ingestion", "processing"]):
-        tags.append("data_ingestion")
-        tags.append("data_processing")
-
-    # FALLBACK: if it's clearly generic “tell me about a project”
-    if not tags and any(w in q for w in ["project", "situation", "example", "experience"]):
-        tags.append("ownership")
-        tags.append("deadline")
-
-    return list(dict.fromkeys(tags))  # deduplicate, keep order
-
-
 def _score_project_for_question(project: dict, behavior_tags: list, question: str) -> float:
     score = 0.0
     proj_tags = set(project.get("tags", []))
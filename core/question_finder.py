@@ -1,7 +1,10 @@
 # core/question_finder.py
 
 import re
-from typing import List
+from typing import Iterable, List, Set
+
+from core.dedupe import DedupeIndex
+from core.text_match import LiteralMatcher, bounded_literals
 
 QUESTION_WORDS = {
     "who", "what", "when", "where", "why", "how",
@@ -54,44 +57,139 @@ IGNORED_PATTERNS = [
 ]
 
 
+# Interviewer boilerplate stripped from the start of a question (each anchored at the start)
+BOILERPLATE_PATTERNS = [
+    r"^so\s+let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
+    r"^so\s+let'?s\s+begin\s+with\s+our\s+first\s+question\s+which\s+is\s+",
+    r"^let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
+    r"^let'?s\s+start\s+with\s+the\s+tell\s+me\s+about\s+yourself\s+question\s*",
+]
+
+# sentence boundary: whitespace after ., ? or !
+SENTENCE_END = re.compile(r"(?<=[.?!])\s+")
+_REPEATED_WORDS = re.compile(r'\b(\w+)( \1){2,}\b')
+_WHITESPACE = re.compile(r"\s+")
+
+# short questions need one of these after the question word
+_SHORT_QUESTION_VERBS = {"explain", "describe", "show", "tell", "walk", "do", "did", "have", "has"}
+
+
+class QuestionPatterns:
+    """
+    The pattern tables above, compiled once.
+
+    Question phrases, '?' and the ignored patterns that are plain words
+    (r"\bwords\b" or r"\b(a|b)\b", all of the defaults) share one
+    LiteralMatcher, so categories() scans a sentence once and reports which
+    of "ignored", "phrase" and "qmark" occur. Any other ignored regex goes
+    into one combined alternation. strip_prefix() removes boilerplate and
+    then leading fillers with a single anchored regex, the same as applying
+    each pattern in turn.
+
+    Extra entries are appended to the module tables, so extending them adds
+    alternatives to the same regexes instead of more passes:
+
+        QuestionFinder(patterns=QuestionPatterns(extra_phrases=["describe a situation"]))
+    """
+
+    def __init__(self, extra_phrases: Iterable[str] = (), extra_ignored: Iterable[str] = (),
+                 extra_fillers: Iterable[str] = (), extra_boilerplate: Iterable[str] = ()):
+        self.phrases = QUESTION_PHRASES + list(extra_phrases)
+        self.ignored = IGNORED_PATTERNS + list(extra_ignored)
+        self.fillers = LEADING_FILLERS + list(extra_fillers)
+        self.boilerplate = BOILERPLATE_PATTERNS + list(extra_boilerplate)
+
+        entries = [("?", "qmark", False)] + [(p, "phrase", False) for p in self.phrases]
+        other_ignored = []
+        for pat in self.ignored:
+            literals = bounded_literals(pat)
+            if literals is None:
+                other_ignored.append(pat)
+            else:
+                entries += [(lit, "ignored", True) for lit in literals]
+        self.matcher = LiteralMatcher(entries)
+        self.ignored_regex = re.compile("|".join(f"(?:{p})" for p in other_ignored)) if other_ignored else None
+
+        prefix = "".join(f"(?:{p[1:] if p.startswith('^') else p})?" for p in self.boilerplate)
+        prefix += "".join(f"(?:{re.escape(f)}[\\s,]+)?" for f in self.fillers)
+        self.prefix = re.compile("^" + prefix)
+
+    def categories(self, lower: str) -> Set[str]:
+        """Subset of {"ignored", "phrase", "qmark"} found in `lower`; stops at the first ignored match."""
+        if self.ignored_regex is not None and self.ignored_regex.search(lower):
+            return {"ignored"}
+        return self.matcher.tags(lower, stop=("ignored",))
+
+    def strip_prefix(self, s: str) -> str:
+        return s[self.prefix.match(s).end():]
+
+
+def _has_repeated_words(s: str) -> bool:
+    """
+    Cheap pre-check for _REPEATED_WORDS: "w w w" needs a space-separated
+    token ending in w followed by the token w.
+    """
+    toks = s.split(" ")
+    return True in map(str.endswith, toks, toks[1:])
+
+
+def _strip_trailing_punct(s: str) -> str:
+    """Same as re.sub(r"[?!.\\s]+$", "", s) without trying the regex at every position."""
+    end = len(s)
+    while end and (s[end - 1] in "?!." or s[end - 1].isspace()):
+        end -= 1
+    return s[:end]
+
+
+_patterns = None
+
+
+def _default_patterns() -> QuestionPatterns:
+    """QuestionPatterns for the module tables, compiled on first use and shared."""
+    global _patterns
+    if _patterns is None:
+        _patterns = QuestionPatterns()
+    return _patterns
+
+
 class QuestionFinder:
     """
-    Stateful question detector over a rolling transcript.
+    Stateful question detector over a streaming transcript.
+
+    Sentences are judged once, when they are finalized (a later chunk starts
+    after their closing punctuation). Only the still-open trailing sentence
+    is kept and re-judged on every call as it grows, so the cost of a call
+    depends on the new text, not on how much transcript came before.
+    `buffer_limit` caps the open sentence (in characters). `patterns` holds
+    the compiled pattern tables (see QuestionPatterns); `seen` is the
+    bounded dedupe store for questions already emitted (see DedupeIndex).
 
     Usage:
         qf = QuestionFinder()
         new_questions = qf.process(new_text_chunk)
     """
 
-    def __init__(self, buffer_limit: int = 4000):
+    def __init__(self, buffer_limit: int = 4000, patterns: QuestionPatterns = None,
+                 seen: DedupeIndex = None):
         self.buffer_limit = buffer_limit
-        self.text_tail = ""          # rolling text buffer
-        self.seen_questions = set()  # normalized strings
+        self.patterns = patterns if patterns is not None else _default_patterns()
+        self._open = ""                               # raw text after the last sentence boundary
+        # normalized strings; `is not None`: an empty DedupeIndex is falsy (it has __len__)
+        self.seen_questions = seen if seen is not None else DedupeIndex()
 
     def _normalize_question(self, s: str) -> str:
         s = s.strip()
 
         # remove trailing punctuation
-        s = re.sub(r"[?!.\s]+$", "", s)
+        s = _strip_trailing_punct(s)
         s = s.lower()
 
-        # strip common boilerplate
-        boilerplate_patterns = [
-            r"^so\s+let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
-            r"^so\s+let'?s\s+begin\s+with\s+our\s+first\s+question\s+which\s+is\s+",
-            r"^let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
-            r"^let'?s\s+start\s+with\s+the\s+tell\s+me\s+about\s+yourself\s+question\s*",
-        ]
-        for pat in boilerplate_patterns:
-            s = re.sub(pat, "", s)
-
-        # strip leading fillers like "so", "okay", etc.
-        for filler in LEADING_FILLERS:
-            pattern = r"^" + re.escape(filler) + r"[\s,]+"
-            s = re.sub(pattern, "", s)
+        # strip common boilerplate, then leading fillers like "so", "okay", etc.
+        s = self.patterns.strip_prefix(s)
 
         # collapse repeated filler tokens and repeated words
-        s = re.sub(r'\b(\w+)( \1){2,}\b', r'\1', s)
+        if _has_repeated_words(s):
+            s = _REPEATED_WORDS.sub(r'\1', s)
 
         # keep from the first question word onwards
         tokens = s.split()
@@ -107,9 +205,13 @@ class QuestionFinder:
         s = " ".join(tokens)
 
         # collapse whitespace
-        s = re.sub(r"\s+", " ", s)
+        s = _WHITESPACE.sub(" ", s)
         return s.strip()
 
+    def normalize(self, s: str) -> str:
+        """`s` as the finder compares questions: lowercased, boilerplate/fillers and trailing punctuation stripped."""
+        return self._normalize_question(s)
+
     def _looks_like_question(self, s: str) -> bool:
         if not s:
             return False
@@ -117,20 +219,13 @@ class QuestionFinder:
         raw = s.strip()
         lower = raw.lower()
 
-        # ignore obvious meeting chatter / commands
-        for pat in IGNORED_PATTERNS:
-            if re.search(pat, lower):
-                return False
-
-        # explicit '?'
-        if "?" in raw:
+        # one scan for meeting chatter / commands, interrogative phrases and '?'
+        found = self.patterns.categories(lower)
+        if "ignored" in found:
+            return False
+        if found:
             return True
 
-        # interrogative phrases
-        for phrase in QUESTION_PHRASES:
-            if phrase in lower:
-                return True
-
         # first token heuristic
         tokens = lower.split()
         if not tokens:
@@ -142,7 +237,7 @@ class QuestionFinder:
             if len(tokens) >= 5:
                 return True
             # short questions like "Can you explain X?" are OK if they contain a verb after the first token
-            if len(tokens) >= 3 and any(t in tokens for t in ["explain", "describe", "show", "tell", "walk", "do", "did", "have", "has"]):
+            if len(tokens) >= 3 and not _SHORT_QUESTION_VERBS.isdisjoint(tokens):
                 return True
 
         # filter explanatory "X is Y, right?" with no 'you/your' (likely not an interview question)
@@ -153,9 +248,34 @@ class QuestionFinder:
 
     def _split_sentences(self, text: str) -> List[str]:
         # split on ., ?, ! but keep text reasonably intact
-        parts = re.split(r"(?<=[.?!])\s+", text)
+        parts = SENTENCE_END.split(text)
         return [p.strip() for p in parts if p.strip()]
 
+    def _accept(self, cand: str) -> bool:
+        """True if `cand` is a question not seen before (and records it as seen)."""
+        # skip tiny fragments
+        if len(cand.split()) < 4:
+            return False
+
+        if not self._looks_like_question(cand):
+            return False
+
+        norm = self._normalize_question(cand)
+        if not norm:
+            return False
+
+        word_count = len(norm.split())
+        # require at least 5 words, at most 50
+        if word_count < 5 or word_count > 50:
+            return False
+
+        # dedupe: substring / superstring similarity on normalized form
+        if self.seen_questions.contains(norm):
+            return False
+
+        self.seen_questions.add(norm)
+        return True
+
     def process(self, new_text: str) -> List[str]:
         """
         Feed new transcript text. Returns a list of *new* questions detected.
@@ -163,41 +283,27 @@ class QuestionFinder:
         if not new_text:
             return []
 
-        # extend rolling buffer
-        self.text_tail += " " + new_text
-        if len(self.text_tail) > self.buffer_limit:
-            self.text_tail = self.text_tail[-self.buffer_limit:]
+        parts = SENTENCE_END.split(self._open + " " + new_text)
+        # every part but the last ended in . ? or ! and won't change any more
+        self._open = parts.pop()
+        if len(self._open) > self.buffer_limit:
+            self._open = self._open[-self.buffer_limit:]
 
-        candidates = self._split_sentences(self.text_tail)
         new_questions: List[str] = []
-
-        for cand in candidates:
-            # skip tiny fragments
-            if len(cand.split()) < 4:
-                continue
-
-            if not self._looks_like_question(cand):
-                continue
-
-            norm = self._normalize_question(cand)
-            if not norm:
-                continue
-
-            word_count = len(norm.split())
-            # require at least 5 words, at most 50
-            if word_count < 5 or word_count > 50:
-                continue
-
-            # dedupe: substring / superstring similarity on normalized form
-            duplicate = False
-            for seen in self.seen_questions:
-                if norm in seen or seen in norm:
-                    duplicate = True
-                    break
-            if duplicate:
-                continue
-
-            self.seen_questions.add(norm)
-            new_questions.append(cand.strip())
+        for cand in parts + [self._open]:
+            cand = cand.strip()
+            if cand and self._accept(cand):
+                new_questions.append(cand)
 
         return new_questions
+
+    def finalize(self) -> List[str]:
+        """
+        The speaker stopped (end of utterance): the open sentence is complete
+        even without closing punctuation. Judges it one last time and starts
+        the next utterance with an empty sentence.
+        """
+        cand, self._open = self._open.strip(), ""
+        if cand and self._accept(cand):
+            return [cand]
+        return []
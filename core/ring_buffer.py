@@ -0,0 +1,97 @@
+# core/ring_buffer.py
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity ring buffer for PCM samples.
+
+    Storage is mirrored (every sample is written at i and i + capacity), so any
+    span of up to `capacity` samples is contiguous and `window()` can hand out a
+    zero-copy view. Nothing is reallocated after construction.
+
+    Usage:
+        ring = AudioRingBuffer(capacity=WINDOW_SAMPLES + STEP_SAMPLES)
+        ring.write(chunk)
+        while ring.available() >= WINDOW_SAMPLES:
+            window = ring.window(WINDOW_SAMPLES)   # view, valid until next write
+            ...
+            ring.advance(STEP_SAMPLES)
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+        self._read = 0       # absolute index of the oldest unread sample
+        self._write = 0      # absolute index one past the newest sample
+        self.dropped = 0     # samples overwritten before they were read
+
+    @property
+    def read_pos(self) -> int:
+        """Absolute stream index of the first sample returned by window()."""
+        return self._read
+
+    @property
+    def write_pos(self) -> int:
+        """Absolute stream index one past the newest sample written."""
+        return self._write
+
+    def available(self) -> int:
+        return self._write - self._read
+
+    def write(self, x: np.ndarray) -> None:
+        """Copy samples in once. If the ring is full the oldest samples are dropped."""
+        n = len(x)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n > cap:
+            # only the newest `capacity` samples can be kept
+            self._write += n - cap
+            x = x[n - cap:]
+            n = cap
+
+        start = self._write % cap
+        first = min(n, cap - start)
+        data = self._data
+        data[start:start + first] = x[:first]
+        data[start + cap:start + cap + first] = x[:first]
+        if first < n:
+            rest = n - first
+            data[:rest] = x[first:]
+            data[cap:cap + rest] = x[first:]
+        self._write += n
+
+        overflow = self.available() - cap
+        if overflow > 0:
+            self._read += overflow
+            self.dropped += overflow
+
+    def window(self, n: int) -> np.ndarray:
+        """Zero-copy view of the oldest `n` unread samples (does not consume them)."""
+        if n > self.available():
+            raise ValueError(f"requested {n} samples, only {self.available()} available")
+        start = self._read % self.capacity
+        return self._data[start:start + n]
+
+    def span(self, start: int, n: int) -> np.ndarray:
+        """
+        Zero-copy view of samples [start, start + n) by absolute stream index,
+        read or not, as long as they haven't been overwritten yet.
+        """
+        start, n = int(start), int(n)
+        oldest = max(0, self._write - self.capacity)
+        if n < 0 or start < oldest or start + n > self._write:
+            raise ValueError(f"samples [{start}, {start + n}) not in buffer [{oldest}, {self._write})")
+        s = start % self.capacity
+        return self._data[s:s + n]
+
+    def advance(self, n: int) -> None:
+        """Consume `n` samples from the read side."""
+        self._read += min(int(n), self.available())
+
+    def clear(self) -> None:
+        self._read = self._write
@@ -0,0 +1,140 @@
+# core/stt_models.py
+
+import os
+import time
+import threading
+from typing import Dict, Tuple
+import numpy as np
+
+# Avoid OpenMP runtime clashes
+os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+
+ModelKey = Tuple[str, str, int, int]  # (model, compute_type, cpu_threads, num_workers)
+
+_models: Dict[ModelKey, object] = {}
+_batched: Dict[ModelKey, object] = {}
+_key_locks: Dict[ModelKey, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+# per-key timings in seconds: {"load_s": ..., "warmup_s": ...}
+timings: Dict[ModelKey, Dict[str, float]] = {}
+
+
+def _lock_for(key: ModelKey) -> threading.Lock:
+    with _registry_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def model_key(cfg_stt: dict) -> ModelKey:
+    """Registry key for the `stt` section of settings.yaml."""
+    return (
+        cfg_stt["model"],
+        cfg_stt.get("compute_type", "int8"),
+        int(cfg_stt.get("cpu_threads", 0)),
+        int(cfg_stt.get("num_workers", 1)),
+    )
+
+
+def configure_threads(cfg_stt: dict) -> None:
+    """
+    Apply `stt.omp_threads` (default 1) to OMP_NUM_THREADS. Only takes effect
+    before the first model is loaded, since OpenMP reads it once at startup.
+    An explicit OMP_NUM_THREADS in the environment wins.
+    """
+    os.environ.setdefault("OMP_NUM_THREADS", str(int(cfg_stt.get("omp_threads", 1))))
+
+
+def warmup(model) -> float:
+    """Run one decode on a second of silence so the first real window isn't slow."""
+    t0 = time.perf_counter()
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1, language="en")
+    for _ in segments:  # segments is lazy; the decode happens while iterating
+        pass
+    return time.perf_counter() - t0
+
+
+def get_model(name: str, compute_type: str = "int8", cpu_threads: int = 0, num_workers: int = 1,
+              warm: bool = False):
+    """
+    Return the shared WhisperModel for (name, compute_type, cpu_threads, num_workers),
+    loading it on first use. Concurrent callers for the same key wait for a
+    single load. With warm=True a freshly loaded model is warmed up too.
+    cpu_threads=0 lets CTranslate2 pick; num_workers > 1 only helps when
+    several decodes run at once.
+    """
+    key = (name, compute_type, int(cpu_threads), int(num_workers))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock_for(key):
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+        from faster_whisper import WhisperModel  # heavy import, only when a model is needed
+
+        print(f"[INFO] Loading Whisper model '{name}' (compute={compute_type}, "
+              f"threads={cpu_threads or 'auto'}, workers={num_workers})...")
+        t0 = time.perf_counter()
+        model = WhisperModel(name, compute_type=compute_type, cpu_threads=int(cpu_threads),
+                             num_workers=int(num_workers))
+        timings[key] = {"load_s": time.perf_counter() - t0}
+        if warm:
+            timings[key]["warmup_s"] = warmup(model)
+        _models[key] = model
+
+    t = timings[key]
+    msg = f"[INFO] Whisper model '{name}' loaded in {t['load_s']:.1f} s"
+    if "warmup_s" in t:
+        msg += f", warmup {t['warmup_s']:.1f} s"
+    print(msg)
+    return model
+
+
+def get_model_for(cfg_stt: dict, warm: bool = False):
+    configure_threads(cfg_stt)
+    name, compute_type, cpu_threads, num_workers = model_key(cfg_stt)
+    return get_model(name, compute_type, cpu_threads, num_workers, warm=warm)
+
+
+def draft_cfg(cfg_stt: dict):
+    """
+    `stt` settings for the draft model of the STT cascade (`stt.draft_model`,
+    compute type `stt.draft_compute_type`, default int8), or None when no
+    draft model is configured.
+    """
+    name = cfg_stt.get("draft_model")
+    if not name:
+        return None
+    return dict(cfg_stt, model=name, compute_type=cfg_stt.get("draft_compute_type", "int8"))
+
+
+def get_batched_for(cfg_stt: dict):
+    """
+    faster-whisper's BatchedInferencePipeline wrapped around the shared model,
+    or None if the installed faster-whisper doesn't have it.
+    """
+    key = model_key(cfg_stt)
+    pipe = _batched.get(key)
+    if pipe is None:
+        try:
+            from faster_whisper import BatchedInferencePipeline
+        except ImportError:
+            return None
+        pipe = _batched.setdefault(key, BatchedInferencePipeline(model=get_model_for(cfg_stt)))
+    return pipe
+
+
+def preload(cfg_stt: dict, warm: bool = True) -> threading.Thread:
+    """Load (and warm up) the configured model on a background thread."""
+    def _load():
+        try:
+            get_model_for(cfg_stt, warm=warm)
+        except Exception as e:
+            print(f"[ERROR] Background Whisper model load failed: {e}")
+
+    th = threading.Thread(target=_load, name="whisper-preload", daemon=True)
+    th.start()
+    return th
@@ -1,18 +1,12 @@
-import os
 import yaml
-from faster_whisper import WhisperModel
-
-# Avoid OpenMP duplicate-lib issues
-os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
-os.environ.setdefault("OMP_NUM_THREADS", "1")
+from core import stt_models
 
 cfg = yaml.safe_load(open("config/settings.yaml"))["stt"]
 
-model = WhisperModel(cfg["model"], compute_type=cfg.get("compute_type", "int8"))
-
 def transcribe_file(file_path: str):
     """Run full transcription on a WAV file."""
     print(f"[INFO] Transcribing file: {file_path}")
+    model = stt_models.get_model_for(cfg)
     segments, info = model.transcribe(
         file_path,
         beam_size=cfg.get("beam_size", 1),
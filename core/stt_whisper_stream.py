@@ -1,72 +1,226 @@
-import os
+import re
+import math
 import yaml
 import numpy as np
-from scipy.signal import resample_poly
-from faster_whisper import WhisperModel
-
-# Avoid OpenMP runtime clashes
-os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
-os.environ.setdefault("OMP_NUM_THREADS", "1")
+from scipy.signal import firwin, resample_poly
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+from core.ring_buffer import AudioRingBuffer
+from core import stt_models
 
 _cfg = yaml.safe_load(open("config/settings.yaml"))
 cfg_stt = _cfg["stt"]
+_catchup_cfg = cfg_stt.get("catchup") or {}
+
+
+def get_model():
+    """Shared Whisper model for the `stt` config, loaded on first use."""
+    return stt_models.get_model_for(cfg_stt)
+
 
-# Load model once
-print(f"[INFO] Loading Whisper model '{cfg_stt['model']}' (compute={cfg_stt.get('compute_type','int8')})...")
-model = WhisperModel(
-    cfg_stt["model"],
-    compute_type=cfg_stt.get("compute_type", "int8")
-)
+SAMPLE_RATE = 16000  # what Whisper expects
 
-def _to_mono_int16(x: np.ndarray, channels_hint: int = 2) -> np.ndarray:
+
+class StreamResampler:
     """
-    Ensure mono int16. Input is 1-D interleaved int16 (PyAudio gives 1-D).
-    If channels_hint == 2, de-interleave and average L/R.
+    Stateful polyphase resampler (any integer rate -> out_rate).
+
+    Uses the same anti-aliasing filter as scipy's resample_poly, but keeps a
+    little input context between calls so a stream can be resampled chunk by
+    chunk with every sample filtered exactly once. Output matches resampling
+    the whole stream in one go.
     """
-    if channels_hint == 2:
-        # Interleaved stereo -> N x 2 then mean
-        if len(x) % 2 == 0:
-            stereo = x.reshape(-1, 2)
-            mono = stereo.mean(axis=1).astype(np.int16)
-            return mono
+
+    def __init__(self, in_rate: int, out_rate: int = SAMPLE_RATE):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        if self.up == self.down:
+            self._h = None
+            self.ctx = 0  # passthrough
         else:
-            # Fallback if odd length: drop last sample
-            stereo = x[:-1].reshape(-1, 2)
-            mono = stereo.mean(axis=1).astype(np.int16)
-            return mono
-    return x  # already mono
-
-def _normalize_to_float32(mono_int16: np.ndarray) -> np.ndarray:
-    f = mono_int16.astype(np.float32)
-    peak = np.max(np.abs(f))
+            max_rate = max(self.up, self.down)
+            half_len = 10 * max_rate  # resample_poly's default filter length
+            self._h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+            # input samples each output depends on, either side; kept a multiple of `down`
+            reach = half_len / self.up + 1
+            self.ctx = self.down * int(math.ceil(reach / self.down))
+
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._buf_start = 0   # absolute input index of _buf[0] (multiple of down)
+        self._emitted = 0     # input index up to which output has been produced (multiple of down)
+
+    def _resample(self, x: np.ndarray) -> np.ndarray:
+        if self._h is None:
+            return x
+        return resample_poly(x, self.up, self.down, window=self._h)
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        """Feed float32 samples; returns whatever output is now final."""
+        buf = np.concatenate((self._buf, x)) if len(self._buf) else x
+        end = self._buf_start + len(buf)
+        emit_end = ((end - self.ctx) // self.down) * self.down
+        if emit_end <= self._emitted:
+            self._buf = buf
+            return np.zeros(0, dtype=np.float32)
+
+        y = self._resample(buf)
+        o0 = (self._emitted - self._buf_start) * self.up // self.down
+        o1 = (emit_end - self._buf_start) * self.up // self.down
+        out = y[o0:o1]
+
+        keep_from = max(self._buf_start, emit_end - self.ctx)
+        self._buf = buf[keep_from - self._buf_start:]
+        self._buf_start = keep_from
+        self._emitted = emit_end
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Emit the remaining tail (zero-padded at the end, like a one-shot resample)."""
+        if len(self._buf) == 0:
+            return np.zeros(0, dtype=np.float32)
+        y = self._resample(self._buf)
+        end = self._buf_start + len(self._buf)
+        o0 = (self._emitted - self._buf_start) * self.up // self.down
+        o1 = -(-(end - self._buf_start) * self.up // self.down)
+        out = y[o0:o1]
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._buf_start = self._emitted = end - (end % self.down)
+        return out
+
+
+class StreamPreprocessor:
+    """
+    Chunk-wise Whisper front end: interleaved int16 at the device rate in,
+    16 kHz mono float32 out.
+
+    Each capture chunk is downmixed, scaled and resampled exactly once, then
+    written into a 16 kHz ring (`self.ring`). Windows are views into that ring;
+    normalized_window() peak-normalizes a view into a reusable scratch buffer.
+    """
+
+    def __init__(self, input_rate: int, channels: int, capacity_s: float = 20.0):
+        self.input_rate = int(input_rate)
+        self.channels = int(channels)
+        self.resampler = StreamResampler(self.input_rate, SAMPLE_RATE)
+        self.ring = AudioRingBuffer(int(capacity_s * SAMPLE_RATE), dtype=np.float32)
+        self._scratch = np.zeros(self.ring.capacity, dtype=np.float32)
+
+    def _downmix(self, x: np.ndarray) -> np.ndarray:
+        if self.channels > 1:
+            usable = len(x) - (len(x) % self.channels)  # drop a trailing partial frame
+            mono = x[:usable].reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            mono = x.astype(np.float32)
+        mono *= 1.0 / 32768.0
+        return mono
+
+    def feed(self, chunk: np.ndarray) -> np.ndarray:
+        """Process one capture chunk; returns the new 16 kHz samples (also written to the ring)."""
+        out = self.resampler.process(self._downmix(chunk))
+        self.ring.write(out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        out = self.resampler.flush()
+        self.ring.write(out)
+        return out
+
+    def normalized_window(self, n: int) -> np.ndarray:
+        """Peak-normalized copy of the oldest `n` ring samples (valid until the next call)."""
+        view = self.ring.window(n)
+        return _peak_normalize(view, self._scratch[:n])
+
+
+def _peak_normalize(x: np.ndarray, out: np.ndarray) -> np.ndarray:
+    peak = float(np.max(np.abs(x))) if x.size else 0.0
     if peak > 0:
-        f /= peak  # peak normalize to [-1, 1]
-    return f
+        np.multiply(x, 1.0 / peak, out=out)  # peak normalize to [-1, 1]
+    else:
+        out[:] = x
+    return out
 
-def _resample_48k_to_16k(x_float: np.ndarray) -> np.ndarray:
-    # 48k -> 16k using polyphase (down by 3)
-    return resample_poly(x_float, 1, 3)
 
-def transcribe_window(raw_int16: np.ndarray, input_rate: int = 48000, channels_hint: int = 2) -> str:
+@dataclass
+class Word:
+    """A decoded word with absolute stream times in seconds."""
+    start: float
+    end: float
+    text: str
+
+    def key(self) -> str:
+        # comparison form: case and punctuation differences between decodes don't matter
+        return re.sub(r"[^\w']+", "", self.text.lower())
+
+
+@dataclass
+class Segment:
+    """A decoded segment with absolute stream times in seconds."""
+    start: float
+    end: float
+    text: str
+    words: List[Word] = field(default_factory=list)
+
+
+def _decode_opts(prompt: Optional[str] = None) -> dict:
+    return dict(
+        beam_size=cfg_stt.get("beam_size", 1),
+        temperature=cfg_stt.get("temperature", 0.0),
+        language="en",
+        word_timestamps=True,
+        initial_prompt=prompt or None,
+    )
+
+
+def transcribe_segments(audio_16k: np.ndarray, offset_s: float = 0.0, horizon_s: Optional[float] = None,
+                        prompt: Optional[str] = None, batched: bool = False,
+                        cfg: Optional[dict] = None) -> List[Segment]:
     """
-    Transcribe a window of raw PCM int16 captured at input_rate (48k), returns text.
+    Transcribe 16 kHz mono float32 audio that starts `offset_s` seconds into
+    the stream; returns segments with word timings on the stream clock.
+
+    With `horizon_s` (the end of what has already been emitted), words that
+    lie mostly before it are dropped: everything ending before the horizon,
+    plus a word re-decoded across it with slightly shifted timing. Segments
+    left without words are dropped and the rest have their text rebuilt from
+    the kept words, so each spoken word comes out once.
+
+    `cfg` selects another model (same keys as the `stt` section); the
+    configured model is used by default.
     """
-    # Downmix
-    mono_i16 = _to_mono_int16(raw_int16, channels_hint=channels_hint)
-    # Normalize
-    mono_f32 = _normalize_to_float32(mono_i16)
-    if mono_f32.size == 0:
-        return ""
-    # Resample to 16k
-    if input_rate == 48000:
-        audio_16k = _resample_48k_to_16k(mono_f32)
+    if audio_16k.size == 0:
+        return []
+    cfg = cfg or cfg_stt
+    pipe = stt_models.get_batched_for(cfg) if batched else None
+    if pipe is not None:
+        raw, _ = pipe.transcribe(audio_16k, batch_size=int(_catchup_cfg.get("batch_size", 8)),
+                                 **_decode_opts(prompt))
     else:
-        # Generic path if you ever change device rate
-        from scipy.signal import resample
-        target_len = int(len(mono_f32) * 16000 / float(input_rate))
-        audio_16k = resample(mono_f32, target_len)
+        # batched decode without the batched pipeline: at least skip the silences
+        model = stt_models.get_model_for(cfg)
+        raw, _ = model.transcribe(audio_16k, vad_filter=batched, **_decode_opts(prompt))
 
-    segments, _ = model.transcribe(
+    segments = []
+    for seg in raw:
+        words = [Word(offset_s + w.start, offset_s + w.end, w.word) for w in seg.words or []]
+        if horizon_s is not None:
+            words = [w for w in words if (w.start + w.end) / 2 >= horizon_s]
+            if not words:
+                continue
+            text = "".join(w.text for w in words).strip()
+        else:
+            text = seg.text.strip()
+        start = words[0].start if words else offset_s + seg.start
+        end = words[-1].end if words else offset_s + seg.end
+        segments.append(Segment(start, end, text, words))
+    return segments
+
+
+def transcribe_audio(audio_16k: np.ndarray) -> str:
+    """Transcribe 16 kHz mono float32 audio, returns text."""
+    if audio_16k.size == 0:
+        return ""
+    segments, _ = get_model().transcribe(
         audio_16k,
         beam_size=cfg_stt.get("beam_size", 1),
         temperature=cfg_stt.get("temperature", 0.0),
@@ -75,3 +229,257 @@ def transcribe_window(raw_int16: np.ndarray, input_rate: int = 48000, channels_h
     )
     text = "".join(s.text for s in segments).strip()
     return text
+
+
+def _window_16k(raw_int16: np.ndarray, input_rate: int, channels_hint: int) -> np.ndarray:
+    seconds = len(raw_int16) / float(input_rate * max(channels_hint, 1))
+    pre = StreamPreprocessor(input_rate, channels_hint, capacity_s=seconds + 1.0)
+    pre.feed(raw_int16)
+    pre.flush()
+    return pre.normalized_window(pre.ring.available())
+
+
+def transcribe_window(raw_int16: np.ndarray, input_rate: int = 48000, channels_hint: int = 2) -> str:
+    """
+    Transcribe a window of raw PCM int16 captured at input_rate (48k), returns text.
+    One-shot helper; the live loop feeds a StreamPreprocessor instead.
+    """
+    return transcribe_audio(_window_16k(raw_int16, input_rate, channels_hint))
+
+
+def transcribe_window_segments(raw_int16: np.ndarray, input_rate: int = 48000, channels_hint: int = 2,
+                               offset_s: float = 0.0, horizon_s: Optional[float] = None) -> List[Segment]:
+    """transcribe_window() with segments and word timings; see transcribe_segments()."""
+    return transcribe_segments(_window_16k(raw_int16, input_rate, channels_hint), offset_s, horizon_s)
+
+
+class StreamingTranscriber:
+    """
+    Incremental decoding with committed-prefix tracking (LocalAgreement-2).
+
+    Audio is appended with insert_audio(). process() decodes only the audio
+    after the committed horizon, with the committed text as the prompt, and
+    commits the words on which the last two decodes agree. Committed audio is
+    dropped from the buffer, so each step decodes a short tail instead of a
+    full window, and every committed word is returned exactly once.
+
+    Usage:
+        st = StreamingTranscriber()
+        st.insert_audio(block_16k)
+        new_text = st.process()        # speech step
+        new_text = st.on_silence()     # quiet step: finalize what is pending
+
+    `cfg` picks the model (default: the `stt` section). With `history_s` the
+    last `history_s` seconds of audio are kept, committed or not, alongside
+    the recently committed words (`words`), so a span can be re-decoded later
+    (see QuestionConfirmer).
+    """
+
+    def __init__(self, max_buffer_s: float = 30.0, force_commit_s: float = 20.0, prompt_chars: int = 200,
+                 cfg: Optional[dict] = None, history_s: float = 0.0):
+        self.cfg = cfg
+        self.audio = AudioRingBuffer(int(max_buffer_s * SAMPLE_RATE), dtype=np.float32)
+        self.history = AudioRingBuffer(int(history_s * SAMPLE_RATE), dtype=np.float32) if history_s > 0 else None
+        self.words: List[Word] = []      # recently committed words, oldest first
+        self._scratch = np.zeros(self.audio.capacity, dtype=np.float32)
+        self.force_commit_s = float(force_commit_s)
+        self.prompt_chars = int(prompt_chars)
+        self.committed_text = ""
+        self.horizon = 0.0               # stream time (s) up to which words are committed
+        self._hypothesis: List[Word] = []
+
+    @property
+    def buffer_start(self) -> float:
+        return self.audio.read_pos / SAMPLE_RATE
+
+    def insert_audio(self, samples: np.ndarray) -> None:
+        self.audio.write(samples)
+        if self.history is not None:
+            self.history.write(samples)
+
+    def buffered_s(self) -> float:
+        return self.audio.available() / SAMPLE_RATE
+
+    def _decode(self, batched: bool = False) -> List[Word]:
+        n = self.audio.available()
+        if n == 0:
+            return []
+        offset = self.buffer_start
+        audio = _peak_normalize(self.audio.window(n), self._scratch[:n])
+        segments = transcribe_segments(audio, offset, prompt=self.committed_text[-self.prompt_chars:],
+                                       batched=batched, cfg=self.cfg)
+        # words re-decoded from audio we already committed are dropped
+        return [w for seg in segments for w in seg.words if w.start >= self.horizon - 0.1]
+
+    def _commit(self, words: List[Word]) -> str:
+        if not words:
+            return ""
+        text = "".join(w.text for w in words).strip()
+        self.committed_text = (self.committed_text + " " + text).strip()[-4 * self.prompt_chars:]
+        self.horizon = max(self.horizon, words[-1].end)
+        self.words.extend(words)
+        if len(self.words) > 1000:
+            del self.words[:len(self.words) - 500]
+        # keep only uncommitted audio
+        horizon_sample = int(self.horizon * SAMPLE_RATE)
+        self.audio.advance(max(0, horizon_sample - self.audio.read_pos))
+        return text
+
+    def process(self) -> str:
+        """Decode the uncommitted tail; returns newly stable text ('' if none)."""
+        words = self._decode()
+
+        agreed = 0
+        for old, new in zip(self._hypothesis, words):
+            if old.key() != new.key():
+                break
+            agreed += 1
+
+        stable, self._hypothesis = words[:agreed], words[agreed:]
+
+        # no agreement for too long: stop the buffer from growing without bound
+        if self.audio.available() / SAMPLE_RATE >= self.force_commit_s:
+            stable, self._hypothesis = words, []
+
+        return self._commit(stable)
+
+    def process_batched(self, tail_s: float = 1.0) -> str:
+        """
+        Catch-up decode: run everything buffered through batched inference and
+        commit all of it except the last `tail_s`, which stays as the hypothesis.
+        """
+        words = self._decode(batched=True)
+        cut = (self.audio.write_pos / SAMPLE_RATE) - tail_s
+        stable = [w for w in words if w.end <= cut]
+        self._hypothesis = words[len(stable):]
+        return self._commit(stable)
+
+    def on_silence(self) -> str:
+        """Nothing new being said: commit any pending hypothesis and drop buffered silence."""
+        text = self._commit(self._hypothesis)
+        self._hypothesis = []
+        self.audio.clear()
+        return text
+
+    def finish(self) -> str:
+        """End of stream (or of an utterance): decode what is left and commit all of it."""
+        words = self._decode()
+        self._hypothesis = []
+        text = self._commit(words)
+        self.audio.clear()
+        return text
+
+
+class CatchUpMonitor:
+    """
+    Switches STT between low-latency "live" decoding and batched "catchup"
+    decoding based on how much audio is queued, with hysteresis, and keeps
+    per-mode real-time factors (busy time / audio time).
+    """
+
+    def __init__(self, enter_backlog_s: float = 9.0, exit_backlog_s: float = 3.0):
+        self.enter_backlog_s = float(enter_backlog_s)
+        self.exit_backlog_s = float(exit_backlog_s)
+        self.mode = "live"
+        self.switches = 0
+        self._audio_s = {"live": 0.0, "catchup": 0.0}
+        self._busy_s = {"live": 0.0, "catchup": 0.0}
+
+    def update(self, backlog_s: float) -> str:
+        if self.mode == "live" and backlog_s >= self.enter_backlog_s:
+            self._switch("catchup", f"backlog {backlog_s:.1f} s")
+        elif self.mode == "catchup" and backlog_s <= self.exit_backlog_s:
+            self._switch("live", f"backlog {backlog_s:.1f} s")
+        return self.mode
+
+    def _switch(self, mode: str, why: str) -> None:
+        print(f"[INFO] STT {self.mode} -> {mode} ({why}); {self.summary()}")
+        self.mode = mode
+        self.switches += 1
+
+    def record(self, mode: str, audio_s: float, busy_s: float) -> None:
+        self._audio_s[mode] += audio_s
+        self._busy_s[mode] += busy_s
+
+    def rtf(self, mode: str) -> float:
+        audio = self._audio_s[mode]
+        return self._busy_s[mode] / audio if audio > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"live RTF {self.rtf('live'):.2f} over {self._audio_s['live']:.0f} s, "
+                f"catch-up RTF {self.rtf('catchup'):.2f} over {self._audio_s['catchup']:.0f} s, "
+                f"{self.switches} mode switches")
+
+
+class QuestionConfirmer:
+    """
+    Second tier of the STT cascade: a fast draft transcriber feeds the
+    question finder, and each question it spots is re-decoded here with the
+    main model before it is answered.
+
+    The question's span is found by aligning its words with the draft
+    transcriber's recently committed words; that span (plus `pad_s`) is cut
+    from the transcriber's audio history and transcribed with `cfg` (default:
+    the `stt` section). Only re-decoded words whose midpoint falls inside
+    the span are kept (the padding is context for the decoder, not part of
+    the question) and returned as decoded. If the span can't be found or
+    nothing is left, the draft text is kept; with `normalize` (e.g.
+    QuestionFinder.normalize), so is a re-decode that normalizes to nothing.
+
+    Usage:
+        draft = StreamingTranscriber(cfg=stt_models.draft_cfg(cfg_stt), history_s=60)
+        confirmer = QuestionConfirmer(draft)
+        text = confirmer.confirm(draft_question)
+    """
+
+    def __init__(self, draft: StreamingTranscriber, cfg: Optional[dict] = None, pad_s: float = 0.3,
+                 search_words: int = 300, normalize: Optional[Callable[[str], str]] = None):
+        if draft.history is None:
+            raise ValueError("QuestionConfirmer needs a StreamingTranscriber created with history_s > 0")
+        self.draft = draft
+        self.cfg = cfg
+        self.pad_s = float(pad_s)
+        self.search_words = int(search_words)
+        self.normalize = normalize
+        self.confirmed = 0
+        self.kept_draft = 0
+
+    def locate(self, text: str) -> Optional[tuple]:
+        """(start_s, end_s) of the most recent run of draft words matching `text`, or None."""
+        keys = [k for k in (Word(0.0, 0.0, t).key() for t in text.split()) if k]
+        words = self.draft.words[-self.search_words:]  # slice copy; the STT thread keeps appending
+        if not keys or not words:
+            return None
+
+        n = len(keys)
+        best_i, best_score = -1, 0
+        for i in range(len(words) - 1, -1, -1):
+            score = sum(1 for j, k in enumerate(keys[:len(words) - i]) if words[i + j].key() == k)
+            if score > best_score:
+                best_i, best_score = i, score
+                if score == n:
+                    break
+        if best_score * 2 < n:
+            return None
+        last = words[min(best_i + n, len(words)) - 1]
+        return words[best_i].start, last.end
+
+    def confirm(self, text: str) -> str:
+        span = self.locate(text)
+        confirmed = ""
+        if span is not None:
+            hist = self.draft.history
+            start = max(int((span[0] - self.pad_s) * SAMPLE_RATE), hist.write_pos - hist.capacity, 0)
+            end = min(int((span[1] + self.pad_s) * SAMPLE_RATE), hist.write_pos)
+            if end > start:
+                audio = np.array(hist.span(start, end - start))  # copy before the STT thread overwrites it
+                segments = transcribe_segments(_peak_normalize(audio, audio), start / SAMPLE_RATE, cfg=self.cfg)
+                words = [w for seg in segments for w in seg.words if span[0] <= (w.start + w.end) / 2 <= span[1]]
+                confirmed = "".join(w.text for w in words).strip()
+                if confirmed and self.normalize is not None and not self.normalize(confirmed):
+                    confirmed = ""  # only boilerplate/fillers: the draft is the better question
+        if not confirmed:
+            self.kept_draft += 1
+            return text
+        self.confirmed += 1
+        return confirmed
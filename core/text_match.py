@@ -0,0 +1,111 @@
+# core/text_match.py
+
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# (literal, tag, word_bounded): word_bounded literals only count between \b's, like r"\bliteral\b"
+Entry = Tuple[str, str, bool]
+
+# r"\bsome words\b" or r"\b(some words|other words)\b" -> plain literals
+_BOUNDED_LITERALS = re.compile(r"\\b(?:\((?P<alts>[\w' ]+(?:\|[\w' ]+)*)\)|(?P<lit>[\w' ]+))\\b")
+
+
+def trie_regex(literals: Iterable[str]) -> str:
+    """
+    One regex alternation for a set of literals, factored on common prefixes
+    ("how did you", "how do you" -> "how\\ d(?:id|o)\\ you"), so the regex
+    engine follows a single branch per character instead of trying every
+    literal at every position. Longer literals win at the same position.
+    """
+    trie: dict = {}
+    for lit in literals:
+        node = trie
+        for ch in lit:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+def bounded_literals(pattern: str) -> Optional[List[str]]:
+    """The literals of a r"\\bwords\\b" / r"\\b(a|b c)\\b" pattern, or None for any other regex."""
+    m = _BOUNDED_LITERALS.fullmatch(pattern)
+    if m is None:
+        return None
+    return (m.group("alts") or m.group("lit")).split("|")
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _bounded(text: str, start: int, end: int) -> bool:
+    """Same test as \\b at both ends of text[start:end]."""
+    if start > 0 and _is_word(text[start - 1]) == _is_word(text[start]):
+        return False
+    if end < len(text) and _is_word(text[end - 1]) == _is_word(text[end]):
+        return False
+    return True
+
+
+class LiteralMatcher:
+    """
+    Finds which tagged literals occur in a text with one compiled regex.
+
+    The literals are merged into a single prefix-factored alternation
+    (trie_regex), so a text is scanned once however many literals there are.
+    The regex only reports the longest literal starting at each position, so
+    every literal also carries the tags of all shorter literals that are its
+    prefixes (the prefix closure); nothing that starts at a matched position
+    is missed, and overlapping occurrences are found by resuming the search
+    one character after each match.
+
+    Usage:
+        m = LiteralMatcher([("tell me about", "phrase", False), ("thanks", "ignored", True)])
+        m.tags("so tell me about it, thanks")   # {"phrase", "ignored"}
+    """
+
+    def __init__(self, entries: Iterable[Entry]):
+        self.entries = list(dict.fromkeys(entries))
+        literals = sorted({lit for lit, _, _ in self.entries if lit})
+        self.regex = re.compile(trie_regex(literals)) if literals else None
+
+        # literal -> [(length, tag, word_bounded)] for it and every table literal that is a prefix of it
+        self._closure: Dict[str, List[Tuple[int, str, bool]]] = {}
+        for lit in literals:
+            self._closure[lit] = sorted(
+                (len(p), tag, bounded) for p, tag, bounded in self.entries if p and lit.startswith(p)
+            )
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """(start, end, tag) for every occurrence of every literal, in start order."""
+        if self.regex is None:
+            return
+        search = self.regex.search
+        pos = 0
+        while True:
+            m = search(text, pos)
+            if m is None:
+                return
+            start = m.start()
+            for length, tag, bounded in self._closure[m.group()]:
+                if not bounded or _bounded(text, start, start + length):
+                    yield start, start + length, tag
+            pos = start + 1
+
+    def tags(self, text: str, stop: Iterable[str] = ()) -> Set[str]:
+        """Tags of all literals present in `text`; returns early once a tag in `stop` is found."""
+        stop = set(stop)
+        found: Set[str] = set()
+        for _, _, tag in self.finditer(text):
+            found.add(tag)
+            if tag in stop:
+                break
+        return found
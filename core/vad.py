@@ -0,0 +1,161 @@
+# core/vad.py
+
+import math
+from typing import List, Tuple
+import numpy as np
+
+# A sample counts as "voiced" at or above 8% of full scale (same rule main.py used).
+VOICED_LEVEL = 0.08
+
+
+class FrameVAD:
+    """
+    Streaming energy VAD over interleaved int16 PCM.
+
+    Each incoming chunk is reduced once to per-frame (default 20 ms) sum of
+    squares and voiced-sample counts. Running totals are kept in a small ring,
+    so "is this window speech?" for any recent span is two subtractions instead
+    of a pass over the window.
+
+    A window is speech when its RMS level reaches `rms_thresh` and it holds at
+    least `min_speech_ms` of voiced samples (voiced samples / rate, as before).
+
+    Frames are also run through a simple speech/silence state machine; a
+    segment closes after `end_silence_ms` of quiet frames. Closed segments are
+    collected for later stages via pop_segments().
+
+    Usage:
+        vad = FrameVAD(rate=48000, channels=2, rms_thresh=0.01, min_speech_ms=300)
+        vad.feed(chunk)
+        if vad.is_speech(start_sample, n_samples):
+            ...
+    """
+
+    def __init__(self, rate: int, channels: int, rms_thresh: float, min_speech_ms: float,
+                 frame_ms: int = 20, history_s: float = 120.0, end_silence_ms: int = 600):
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.rms_thresh = float(rms_thresh)
+        self.min_speech_ms = float(min_speech_ms)
+        self.frame_ms = int(frame_ms)
+        self.frame_samples = int(self.rate * self.frame_ms / 1000) * self.channels
+        self.end_silence_frames = max(1, int(math.ceil(end_silence_ms / self.frame_ms)))
+        self._voiced_thr = int(math.ceil(VOICED_LEVEL * 32768.0))
+
+        # cumulative totals at frame boundaries: _cum_*[k % C] covers frames [0, k)
+        self.capacity = max(1, int(history_s * 1000 / self.frame_ms))
+        self._cum_sq = np.zeros(self.capacity + 1, dtype=np.float64)
+        self._cum_voiced = np.zeros(self.capacity + 1, dtype=np.int64)
+        self.frames = 0  # complete frames seen so far
+
+        # partial frame carried over between chunks
+        self._pending = np.zeros(self.frame_samples, dtype=np.int16)
+        self._pending_n = 0
+
+        # segmentation state
+        self.in_speech = False
+        self._seg_start = 0
+        self._last_voiced = -1
+        self._closed: List[Tuple[float, float]] = []
+
+    # ---------- feeding ----------
+
+    def feed(self, chunk: np.ndarray) -> None:
+        x = chunk
+        fs = self.frame_samples
+
+        if self._pending_n:
+            take = min(fs - self._pending_n, len(x))
+            self._pending[self._pending_n:self._pending_n + take] = x[:take]
+            self._pending_n += take
+            x = x[take:]
+            if self._pending_n < fs:
+                return
+            self._add_frames(self._pending.reshape(1, fs))
+            self._pending_n = 0
+
+        n_full = len(x) // fs
+        if n_full:
+            self._add_frames(x[:n_full * fs].reshape(n_full, fs))
+        rest = len(x) - n_full * fs
+        if rest:
+            self._pending[:rest] = x[n_full * fs:]
+            self._pending_n = rest
+
+    def _add_frames(self, frames: np.ndarray) -> None:
+        f = frames.astype(np.float64)
+        sq = np.einsum("ij,ij->i", f, f)
+        voiced = np.count_nonzero((frames >= self._voiced_thr) | (frames <= -self._voiced_thr), axis=1)
+
+        n = len(sq)
+        k0 = self.frames
+        idx = np.arange(k0 + 1, k0 + n + 1) % (self.capacity + 1)
+        prev = (k0 % (self.capacity + 1))
+        self._cum_sq[idx] = self._cum_sq[prev] + np.cumsum(sq)
+        self._cum_voiced[idx] = self._cum_voiced[prev] + np.cumsum(voiced)
+        self.frames = k0 + n
+
+        frame_level = np.sqrt(sq / self.frame_samples) / 32768.0
+        for i, is_voiced in enumerate(frame_level >= self.rms_thresh):
+            self._update_segment(k0 + i, bool(is_voiced))
+
+    def _update_segment(self, k: int, is_voiced: bool) -> None:
+        if is_voiced:
+            if not self.in_speech:
+                self.in_speech = True
+                self._seg_start = k
+            self._last_voiced = k
+        elif self.in_speech and k - self._last_voiced >= self.end_silence_frames:
+            self.in_speech = False
+            self._closed.append((self.frame_to_seconds(self._seg_start),
+                                 self.frame_to_seconds(self._last_voiced + 1)))
+
+    # ---------- queries ----------
+
+    def frame_to_seconds(self, k: int) -> float:
+        return k * self.frame_ms / 1000.0
+
+    def sample_to_frame(self, sample_index: int) -> int:
+        """Frame index for an absolute interleaved-sample position."""
+        return int(sample_index) // self.frame_samples
+
+    def window_stats(self, start_frame: int, n_frames: int) -> Tuple[float, float]:
+        """(rms level in [0, 1], voiced ms) over frames [start_frame, start_frame + n_frames)."""
+        end = start_frame + n_frames
+        if n_frames <= 0:
+            return 0.0, 0.0
+        if end > self.frames or start_frame < self.frames - self.capacity or start_frame < 0:
+            raise ValueError(f"frames [{start_frame}, {end}) not in VAD history "
+                             f"[{max(0, self.frames - self.capacity)}, {self.frames})")
+        C = self.capacity + 1
+        sumsq = self._cum_sq[end % C] - self._cum_sq[start_frame % C]
+        voiced = int(self._cum_voiced[end % C] - self._cum_voiced[start_frame % C])
+        level = math.sqrt(max(sumsq, 0.0) / (n_frames * self.frame_samples)) / 32768.0
+        voiced_ms = voiced / self.rate * 1000.0
+        return level, voiced_ms
+
+    def is_speech(self, start_sample: int, n_samples: int) -> bool:
+        """Speech test for a span of interleaved samples (rounded to whole frames)."""
+        start = self.sample_to_frame(start_sample)
+        n = self.sample_to_frame(start_sample + n_samples) - start
+        level, voiced_ms = self.window_stats(start, n)
+        return level >= self.rms_thresh and voiced_ms >= self.min_speech_ms
+
+    def is_speech_between(self, start_s: float, end_s: float) -> bool:
+        """Speech test for a time span in seconds (rounded to whole frames, clipped to what was fed)."""
+        start = int(round(start_s * 1000.0 / self.frame_ms))
+        end = min(int(round(end_s * 1000.0 / self.frame_ms)), self.frames)
+        level, voiced_ms = self.window_stats(start, end - start)
+        return level >= self.rms_thresh and voiced_ms >= self.min_speech_ms
+
+    def flush(self) -> None:
+        """End of stream: close a segment that is still open."""
+        if self.in_speech:
+            self.in_speech = False
+            self._closed.append((self.frame_to_seconds(self._seg_start),
+                                 self.frame_to_seconds(self._last_voiced + 1)))
+
+    def pop_segments(self) -> List[Tuple[float, float]]:
+        """Speech segments (start_s, end_s) that closed since the last call."""
+        out, self._closed = self._closed, []
+        return out
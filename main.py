@@ -3,123 +3,216 @@
 qa_log = []  # list of dicts: {"q": ..., "bullets": [...]}
 
 qa_log_file = "qa_log.json"
+import time
 import yaml
+import argparse
 import threading
-import numpy as np
-from queue import Queue
 from core.answer_llm import AnswerEngine
-from core.audio_capture import capture_stream
-from core.stt_whisper_stream import transcribe_window
-from core.question_finder import QuestionFinder
+from core.audio_capture import make_source
+from core.pipeline import (
+    Stage, StageQueue, make_queue,
+    AudioHandler, SttHandler, QuestionHandler, ConfirmHandler, AnswerHandler,
+)
+from core.dedupe import DedupeIndex
+from core.metrics import LatencyTracker
+from core.question_finder import QuestionFinder, QuestionPatterns
+from core.vad import FrameVAD
+from core import stt_models
+from core.stt_whisper_stream import (
+    SAMPLE_RATE, CatchUpMonitor, QuestionConfirmer, StreamPreprocessor, StreamingTranscriber,
+)
 from transcripts.transcript_writer import write_session_transcript  # NEW
 
+cfg = yaml.safe_load(open("config/settings.yaml"))
+
 answer_engine = AnswerEngine(
     role="MLOps Engineer",
     resume_path="data/resume.md",
-    jd_path="data/current_jd.md"
+    jd_path="data/current_jd.md",
+    near_dup=(cfg.get("answers") or {}).get("near_dup"),
+    semantic=(cfg.get("answers") or {}).get("semantic"),
+    write_through=(cfg.get("answers") or {}).get("write_through", True),
 )
 
-cfg = yaml.safe_load(open("config/settings.yaml"))
 audio_cfg = cfg["audio"]
 stream_cfg = cfg["streaming"]
+pipeline_cfg = cfg.get("pipeline") or {}
+stt_cfg = cfg["stt"]
 
-RATE = int(audio_cfg["rate"])
-CHANNELS = int(audio_cfg["channels"])
 WINDOW_S = int(stream_cfg["window_s"])
 STEP_S = int(stream_cfg["step_s"])
 VAD_RMS_THR = float(stream_cfg["vad_rms_thresh"])
 MIN_SPEECH_MS = int(stream_cfg["min_speech_ms"])
+# "incremental": decode only the uncommitted tail (default); "window": re-decode full windows
+STT_MODE = stream_cfg.get("mode", "incremental")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Live interview helper")
+    ap.add_argument("--source", choices=["loopback", "wav"],
+                    help="audio source (default: audio.source in config/settings.yaml)")
+    ap.add_argument("--wav", help="WAV file to replay (implies --source wav)")
+    ap.add_argument("--speed", help="replay speed: 1 = real time, N = N x faster, 'max' = as fast as possible")
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = make_source(
+        audio_cfg,
+        source=args.source or ("wav" if args.wav else None),
+        path=args.wav,
+        speed=args.speed,
+    )
+    rate, channels = source.rate, source.channels
+
+    incremental = STT_MODE == "incremental"
+
+    # cascade: a small draft model transcribes every step, questions it spots
+    # are re-decoded with the main model before they are answered
+    draft_cfg = stt_models.draft_cfg(stt_cfg)
+    if draft_cfg and not incremental:
+        print("[WARN] stt.draft_model only works with streaming.mode: incremental; ignoring it.")
+        draft_cfg = None
+
+    # load + warm the Whisper model(s) while capture starts up instead of on the first window
+    if stt_cfg.get("preload", True):
+        stt_models.preload(stt_cfg, warm=stt_cfg.get("warmup", True))
+        if draft_cfg:
+            stt_models.preload(draft_cfg, warm=stt_cfg.get("warmup", True))
+
+    # capture -> audio (VAD + 16 kHz) -> STT -> question finder -> answers,
+    # one thread per stage, bounded queues in between. The answer queue drops
+    # rather than blocks so a slow LLM call never holds up transcription.
+    # the audio source applies its backpressure policy itself (drops are counted in source.stats);
+    # the policy is passed here so the queue's [STATS] line reports it
+    capture_q = StageQueue("capture", int(audio_cfg.get("queue_size", 20)), source.backpressure)
+    stt_q = make_queue("stt", pipeline_cfg, 16, "block")
+    text_q = make_queue("text", pipeline_cfg, 64, "block")
+    answer_q = make_queue("answers", pipeline_cfg, 16, "drop_oldest")
+    queues = [capture_q, stt_q, text_q, answer_q]
+    if draft_cfg:
+        confirm_q = make_queue("confirm", pipeline_cfg, 16, "block")
+        queues.insert(3, confirm_q)
+
+    # each capture chunk is downmixed/resampled once into a fixed-capacity 16 kHz ring
+    pre = StreamPreprocessor(rate, channels, capacity_s=2 * WINDOW_S)
+    # per-frame energy computed once per chunk; windows are judged from running sums
+    vad = FrameVAD(
+        rate=rate,
+        channels=channels,
+        rms_thresh=VAD_RMS_THR,
+        min_speech_ms=MIN_SPEECH_MS,
+        frame_ms=int(stream_cfg.get("vad_frame_ms", 20)),
+        history_s=4 * WINDOW_S,
+        end_silence_ms=int(stream_cfg.get("end_silence_ms", 600)),
+    )
+    # catch-up: when STT falls behind, queued blocks are decoded together in batches
+    catchup_cfg = stt_cfg.get("catchup") or {}
+    catchup = None
+    max_batch_s = float(catchup_cfg.get("max_batch_s", 60))
+    if incremental and catchup_cfg.get("enabled", True):
+        catchup = CatchUpMonitor(
+            enter_backlog_s=float(catchup_cfg.get("enter_backlog_s", 3 * STEP_S)),
+            exit_backlog_s=float(catchup_cfg.get("exit_backlog_s", STEP_S)),
+        )
+    buffer_s = max(3 * WINDOW_S, max_batch_s + 2 * WINDOW_S) if catchup else 3 * WINDOW_S
+    transcriber = StreamingTranscriber(
+        max_buffer_s=buffer_s,
+        force_commit_s=2 * WINDOW_S,
+        cfg=draft_cfg,
+        history_s=float(stt_cfg.get("confirm_history_s", 60)) if draft_cfg else 0.0,
+    )
+
+    # user additions to the question finder's phrase / ignore / filler / boilerplate tables
+    q_cfg = cfg.get("questions") or {}
+    question_patterns = QuestionPatterns(
+        extra_phrases=q_cfg.get("extra_phrases") or (),
+        extra_ignored=q_cfg.get("extra_ignored") or (),
+        extra_fillers=q_cfg.get("extra_fillers") or (),
+        extra_boilerplate=q_cfg.get("extra_boilerplate") or (),
+    )
+    # a closed VAD segment forces the pending speech through STT and the question finder
+    # right away instead of at the next step; latency is tracked either way
+    end_of_utterance = bool(stream_cfg.get("end_of_utterance", True))
+    if end_of_utterance and not incremental:
+        print("[WARN] streaming.end_of_utterance only works with streaming.mode: incremental; ignoring it.")
+        end_of_utterance = False
+    question_latency = LatencyTracker("speech end -> question")
+
+    # questions already emitted; bounded so all-day sessions don't grow without limit
+    seen_questions = DedupeIndex(
+        capacity=int(q_cfg.get("dedupe_capacity", 5000)),
+        max_age_s=q_cfg.get("dedupe_max_age_s"),
+        near_threshold=q_cfg.get("dedupe_near"),
+    )
+    question_finder = QuestionFinder(patterns=question_patterns, seen=seen_questions)
 
-WINDOW_SAMPLES = RATE * WINDOW_S
-STEP_SAMPLES = RATE * STEP_S
-
-
-def rms(x: np.ndarray) -> float:
-    if x.size == 0:
-        return 0.0
-    f = x.astype(np.float32)
-    return float(np.sqrt(np.mean(np.square(f))) / 32768.0)
-
-
-def has_enough_voiced(x: np.ndarray) -> bool:
-    if x.size == 0:
-        return False
-    f = x.astype(np.float32)
-    thr = 0.08 * 32768.0
-    voiced = np.sum(np.abs(f) >= thr)
-    voiced_ms = (voiced / RATE) * 1000.0
-    return voiced_ms >= MIN_SPEECH_MS
-
-
-def longest_common_prefix(a: str, b: str) -> int:
-    n = min(len(a), len(b))
-    i = 0
-    while i < n and a[i] == b[i]:
-        i += 1
-    return i
-
-
-def main():
-    q = Queue(maxsize=20)
     stop_flag = threading.Event()
-    cap_thread = threading.Thread(target=capture_stream, args=(q, stop_flag), daemon=True)
+    stages = [
+        Stage("audio", AudioHandler(pre, vad, WINDOW_S, STEP_S, incremental, release=source.release,
+                                    end_of_utterance=end_of_utterance, latency=question_latency),
+              capture_q, stt_q, upstream_done=stop_flag),
+        Stage("stt", SttHandler(incremental, transcriber, catchup=catchup, backlog=stt_q,
+                                step_s=STEP_S, max_batch_s=max_batch_s), stt_q, text_q),
+        Stage("questions", QuestionHandler(question_finder, latency=question_latency),
+              text_q, confirm_q if draft_cfg else answer_q),
+        Stage("answers", AnswerHandler(answer_engine, qa_log), answer_q),
+    ]
+    if draft_cfg:
+        confirmer = QuestionConfirmer(transcriber)
+        stages.insert(3, Stage("confirm", ConfirmHandler(confirmer), confirm_q, answer_q))
+
+    def report():
+        for st in stages:
+            print(st.timer.summary())
+        for sq in queues:
+            print(sq.summary())
+        print(source.stats.summary())
+        print(question_latency.summary() + (" [end-of-utterance on]" if end_of_utterance else ""))
+        if answer_engine.semantic_retriever is not None:
+            print(answer_engine.semantic_retriever.index.cache.summary())
+        if catchup is not None:
+            print(f"[STATS] STT: {catchup.summary()}")
+        if draft_cfg:
+            print(f"[STATS] STT cascade: {confirmer.confirmed} questions confirmed with "
+                  f"'{stt_cfg['model']}', {confirmer.kept_draft} kept as drafted by '{draft_cfg['model']}'")
+
+    cap_thread = threading.Thread(target=source.run, args=(capture_q, stop_flag), daemon=True)
+    for st in stages:
+        st.start()
     cap_thread.start()
 
-    buffer = np.array([], dtype=np.int16)
-    printed_text_tail = ""
-    qfinder = QuestionFinder()
-
-    print("[INFO] Starting live transcription + question finder...")
+    print(f"[INFO] Starting live transcription ({STT_MODE} mode) + question finder...")
+    t_start = time.perf_counter()
+    last_report = t_start
     try:
-        while not stop_flag.is_set():
-            # drain queue quickly
-            while not q.empty():
-                buffer = np.concatenate((buffer, q.get()))
-
-            if buffer.size >= WINDOW_SAMPLES:
-                window = buffer[:WINDOW_SAMPLES]
-
-                level = rms(window)
-                if level >= VAD_RMS_THR and has_enough_voiced(window):
-                    text = transcribe_window(window, input_rate=RATE, channels_hint=CHANNELS)
-                    if text:
-                        last_tail = printed_text_tail[-2000:]
-                        lcp = longest_common_prefix(last_tail + text, last_tail)
-                        new_part = (last_tail + text)[lcp:]
-                        new_part = new_part.strip()
-
-                        if new_part:
-                            # 1) Print transcript snippets (optional)
-                            for line in new_part.split(". "):
-                                line = line.strip()
-                                if line:
-                                    print("🗣️", line)
-
-                            printed_text_tail += new_part
-                            if len(printed_text_tail) > 8000:
-                                printed_text_tail = printed_text_tail[-8000:]
-
-                            # 2) Feed into question finder
-                            new_questions = qfinder.process(new_part)
-                            for q_text in new_questions:
-                                print("❓ Q:", q_text)
-                                bullets = answer_engine.generate_answer(q_text)
-                                for b in bullets:
-                                    print("➡", b)
-                                print("--------------------------------")
-
-                                qa_log.append({"q": q_text, "bullets": bullets})
-
-                # slide window
-                buffer = buffer[STEP_SAMPLES:]
+        # stages shut down in order once the source stops and everything drains
+        while stages[-1].is_alive():
+            stages[-1].join(timeout=1.0)
+            if time.perf_counter() - last_report >= 60:
+                last_report = time.perf_counter()
+                report()
     except KeyboardInterrupt:
         pass
     finally:
         stop_flag.set()
         cap_thread.join()
+        for st in stages:
+            # an in-flight LLM call may still be running; don't wait forever for it
+            st.join(timeout=5.0)
+
+        if pre.ring.dropped:
+            print(f"[WARN] Window buffer overflowed, {pre.ring.dropped} samples dropped.")
+        report()
+        audio_s = pre.ring.write_pos / float(SAMPLE_RATE)
+        wall_s = time.perf_counter() - t_start
+        if audio_s > 0:
+            print(f"[STATS] Processed {audio_s:.1f} s of {source.name} audio in {wall_s:.1f} s "
+                  f"(real-time factor {wall_s / audio_s:.2f})")
 
         # write QA log via transcript writer
-        out_path = write_session_transcript(qa_log)
+        out_path = write_session_transcript(list(qa_log))
         print(f"[INFO] Q&A log saved to {out_path}")
         print("[INFO] Exiting live mode.")
 
@@ -0,0 +1,136 @@
+# tools/autotune_stt.py
+"""
+Pick faster-whisper CPU settings for this machine.
+
+Runs a fixed benchmark clip through every combination of cpu_threads,
+num_workers and compute_type, and writes the fastest combination that still
+transcribes in real time into the `stt` section of config/settings.yaml.
+
+    python tools/autotune_stt.py --clip data/bench/clip.wav
+    python tools/autotune_stt.py --clip data/bench/clip.wav --threads 2,4,8 --dry-run
+
+num_workers > 1 is measured with that many decodes running at once (it only
+helps when several windows are decoded concurrently); a combination meets
+real time when every concurrent decode finishes within the clip length.
+"""
+import os
+import sys
+import time
+import wave
+import argparse
+import threading
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.stt_whisper_stream import SAMPLE_RATE, StreamPreprocessor
+
+
+def load_clip(path: str) -> np.ndarray:
+    """16 kHz mono float32 version of a 16-bit PCM WAV."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        raw = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    pre = StreamPreprocessor(rate, channels, capacity_s=len(raw) / float(rate * channels) + 1.0)
+    pre.feed(raw)
+    pre.flush()
+    return pre.normalized_window(pre.ring.available()).copy()
+
+
+def _decode(model, audio: np.ndarray, cfg_stt: dict) -> None:
+    segments, _ = model.transcribe(
+        audio,
+        beam_size=cfg_stt.get("beam_size", 1),
+        temperature=cfg_stt.get("temperature", 0.0),
+        vad_filter=False,
+        language="en",
+    )
+    for _ in segments:
+        pass
+
+
+def bench_combo(model_name: str, compute_type: str, threads: int, workers: int,
+                audio: np.ndarray, cfg_stt: dict, repeats: int) -> float:
+    """Best-of-`repeats` real-time factor (wall / audio) of `workers` concurrent decodes."""
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_name, compute_type=compute_type, cpu_threads=threads, num_workers=workers)
+    _decode(model, audio[:SAMPLE_RATE], cfg_stt)  # warmup
+    clip_s = len(audio) / SAMPLE_RATE
+
+    best = float("inf")
+    for _ in range(repeats):
+        runners = [threading.Thread(target=_decode, args=(model, audio, cfg_stt)) for _ in range(workers)]
+        t0 = time.perf_counter()
+        for r in runners:
+            r.start()
+        for r in runners:
+            r.join()
+        best = min(best, (time.perf_counter() - t0) / clip_s)
+    del model
+    return best
+
+
+def _int_list(s: str):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main():
+    cpus = os.cpu_count() or 4
+    default_threads = sorted({t for t in (1, 2, 4, 6, 8, 12, 16) if t <= cpus} | {cpus})
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clip", default=os.path.join("data", "bench", "clip.wav"), help="benchmark WAV")
+    ap.add_argument("--config", default=os.path.join("config", "settings.yaml"))
+    ap.add_argument("--threads", type=_int_list, default=default_threads, help="comma list of cpu_threads")
+    ap.add_argument("--workers", type=_int_list, default=[1], help="comma list of num_workers")
+    ap.add_argument("--compute-types", default="int8,int16,float32", help="comma list of compute types")
+    ap.add_argument("--max-rtf", type=float, default=1.0,
+                    help="real-time factor a combination must beat (lower leaves more headroom)")
+    ap.add_argument("--repeats", type=int, default=2)
+    ap.add_argument("--dry-run", action="store_true", help="report only, don't write the config")
+    args = ap.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg_stt = cfg["stt"]
+
+    audio = load_clip(args.clip)
+    compute_types = [c.strip() for c in args.compute_types.split(",") if c.strip()]
+    print(f"[INFO] {os.cpu_count()} CPUs, model '{cfg_stt['model']}', clip {len(audio) / SAMPLE_RATE:.1f} s")
+
+    results = []
+    for compute_type in compute_types:
+        for threads in args.threads:
+            for workers in args.workers:
+                try:
+                    rtf = bench_combo(cfg_stt["model"], compute_type, threads, workers, audio, cfg_stt, args.repeats)
+                except Exception as e:
+                    print(f"  {compute_type:8s} threads={threads:<3d} workers={workers}: failed ({e})")
+                    continue
+                ok = rtf <= args.max_rtf
+                results.append((rtf, compute_type, threads, workers))
+                print(f"  {compute_type:8s} threads={threads:<3d} workers={workers}: RTF {rtf:.3f}"
+                      f"{'' if ok else '  (too slow)'}")
+
+    viable = sorted(r for r in results if r[0] <= args.max_rtf)
+    if not viable:
+        print(f"[WARN] No combination met RTF <= {args.max_rtf}; try a smaller stt.model. Config unchanged.")
+        return
+
+    rtf, compute_type, threads, workers = viable[0]
+    print(f"[INFO] Fastest: compute_type={compute_type}, cpu_threads={threads}, num_workers={workers} (RTF {rtf:.3f})")
+    if args.dry_run:
+        return
+
+    cfg_stt.update(compute_type=compute_type, cpu_threads=threads, num_workers=workers)
+    with open(args.config, "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    print(f"[INFO] Wrote stt settings to {args.config} (comments in the file are not preserved)")
+
+
+if __name__ == "__main__":
+    main()
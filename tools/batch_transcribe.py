@@ -0,0 +1,277 @@
+# tools/batch_transcribe.py
+"""
+Transcribe a batch of recorded sessions (16-bit PCM WAV).
+
+Each file is scanned once with the streaming VAD and cut into speech jobs of
+at most --max-job-s seconds; silence is never decoded. Jobs run on a process
+pool, one Whisper model per worker, and each worker reads only its own
+sample range from the WAV. Segments are written to <file>.txt in time order
+as soon as every earlier job of that file is done, and only a few jobs per
+worker are in flight, so memory stays flat however long the recordings are.
+
+    python tools/batch_transcribe.py data/mock_interviews/
+    python tools/batch_transcribe.py "data/archive/**/*.wav" --workers 4 --threads 2
+"""
+import os
+import sys
+import glob
+import time
+import wave
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vad import FrameVAD
+
+Job = Tuple[int, int, str, float, float]  # (file index, job index, path, start_s, end_s)
+
+_worker_cfg = None  # `stt` settings inside a worker process
+
+
+def find_wavs(inputs: List[str]) -> List[str]:
+    """WAV files from directories (searched recursively), globs and plain paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += glob.glob(os.path.join(item, "**", "*.wav"), recursive=True)
+        else:
+            paths += glob.glob(item, recursive=True) or [item]
+    return sorted(dict.fromkeys(p for p in paths if p.lower().endswith(".wav")))
+
+
+def speech_spans(path: str, stream_cfg: dict, pad_s: float, max_gap_s: float,
+                 chunk_s: float = 1.0) -> Iterator[Tuple[float, float]]:
+    """VAD speech spans of a WAV, padded and with short gaps merged, read chunk by chunk."""
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        duration = wf.getnframes() / float(rate)
+        vad = FrameVAD(
+            rate=rate,
+            channels=channels,
+            rms_thresh=float(stream_cfg["vad_rms_thresh"]),
+            min_speech_ms=int(stream_cfg["min_speech_ms"]),
+            frame_ms=int(stream_cfg.get("vad_frame_ms", 20)),
+            history_s=10.0,
+            end_silence_ms=int(stream_cfg.get("end_silence_ms", 600)),
+        )
+        frames_per_chunk = int(rate * chunk_s)
+        pending = None
+        while True:
+            data = wf.readframes(frames_per_chunk)
+            if data:
+                vad.feed(np.frombuffer(data, dtype=np.int16))
+            else:
+                vad.flush()
+            for start, end in vad.pop_segments():
+                start, end = max(0.0, start - pad_s), min(duration, end + pad_s)
+                if pending is not None and start - pending[1] <= max_gap_s:
+                    pending = (pending[0], end)
+                    continue
+                if pending is not None:
+                    yield pending
+                pending = (start, end)
+            if not data:
+                break
+        if pending is not None:
+            yield pending
+
+
+def plan_jobs(paths: List[str], stream_cfg: dict, max_job_s: float, pad_s: float,
+              max_gap_s: float) -> Iterator[Job]:
+    """
+    Speech spans grouped into jobs of at most `max_job_s`; spans longer than
+    that are cut into equal pieces. Lazy, so planning overlaps decoding.
+    """
+    for fi, path in enumerate(paths):
+        ji = 0
+        job = None
+        for start, end in speech_spans(path, stream_cfg, pad_s, max_gap_s):
+            if job is not None and end - job[0] <= max_job_s:
+                job = (job[0], end)
+                continue
+            if job is not None:
+                yield fi, ji, path, job[0], job[1]
+                ji += 1
+            pieces = max(1, int(np.ceil((end - start) / max_job_s)))
+            step = (end - start) / pieces
+            for k in range(pieces - 1):
+                yield fi, ji, path, start + k * step, start + (k + 1) * step
+                ji += 1
+            job = (start + (pieces - 1) * step, end)
+        if job is not None:
+            yield fi, ji, path, job[0], job[1]
+            ji += 1
+        # end-of-file marker so the writer knows how many jobs this file has
+        yield fi, ji, path, -1.0, -1.0
+
+
+def _init_worker(cfg_stt: dict, threads: int) -> None:
+    global _worker_cfg
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from core import stt_models
+
+    _worker_cfg = dict(cfg_stt, cpu_threads=threads, num_workers=1)
+    stt_models.get_model_for(_worker_cfg, warm=False)
+
+
+def _read_range(path: str, start_s: float, end_s: float) -> np.ndarray:
+    """16 kHz mono float32 audio for [start_s, end_s) of a WAV, peak-normalized."""
+    from core.stt_whisper_stream import StreamPreprocessor
+
+    with wave.open(path, "rb") as wf:
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        first = int(start_s * rate)
+        wf.setpos(first)
+        raw = np.frombuffer(wf.readframes(int(end_s * rate) - first), dtype=np.int16)
+    pre = StreamPreprocessor(rate, channels, capacity_s=end_s - start_s + 1.0)
+    pre.feed(raw)
+    pre.flush()
+    return pre.normalized_window(pre.ring.available()).copy()
+
+
+def _transcribe_job(path: str, start_s: float, end_s: float) -> List[Tuple[float, float, str]]:
+    from core import stt_models
+
+    audio = _read_range(path, start_s, end_s)
+    if audio.size == 0:
+        return []
+    model = stt_models.get_model_for(_worker_cfg)
+    segments, _ = model.transcribe(
+        audio,
+        beam_size=_worker_cfg.get("beam_size", 1),
+        temperature=_worker_cfg.get("temperature", 0.0),
+        vad_filter=False,
+        language="en",
+    )
+    return [(start_s + s.start, start_s + s.end, s.text.strip()) for s in segments if s.text.strip()]
+
+
+class OrderedWriter:
+    """Writes each file's job results in job order as they become contiguous."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self._files = {}
+        self._next = {}
+        self._waiting = {}
+        self._total = {}
+        self.done_files = 0
+
+    def _open(self, fi: int) -> None:
+        if fi not in self._files:
+            out_path = os.path.splitext(self.paths[fi])[0] + ".txt"
+            self._files[fi] = open(out_path, "w", encoding="utf-8")
+            self._next[fi] = 0
+            self._waiting[fi] = {}
+
+    def add(self, fi: int, ji: int, segments) -> None:
+        self._open(fi)
+        self._waiting[fi][ji] = segments
+        f, waiting = self._files[fi], self._waiting[fi]
+        while self._next[fi] in waiting:
+            for start, end, text in waiting.pop(self._next[fi]):
+                f.write(f"[{start:.2f} s → {end:.2f} s] {text}\n")
+            self._next[fi] += 1
+        f.flush()
+        self._maybe_close(fi)
+
+    def end_of_file(self, fi: int, n_jobs: int) -> None:
+        self._total[fi] = n_jobs
+        if n_jobs == 0:
+            self._open(fi)  # no speech: still leave an (empty) transcript
+        self._maybe_close(fi)
+
+    def _maybe_close(self, fi: int) -> None:
+        if fi in self._files and self._next[fi] == self._total.get(fi):
+            self._files.pop(fi).close()
+            del self._waiting[fi], self._next[fi], self._total[fi]
+            self.done_files += 1
+            print(f"[INFO] Transcript saved: {os.path.splitext(self.paths[fi])[0]}.txt")
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+def _wav_seconds(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def main():
+    cpus = os.cpu_count() or 4
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inputs", nargs="+", help="WAV files, directories or glob patterns")
+    ap.add_argument("--config", default=os.path.join("config", "settings.yaml"))
+    ap.add_argument("--workers", type=int, default=max(1, cpus // 2), help="worker processes")
+    ap.add_argument("--threads", type=int, default=0, help="cpu_threads per worker (default: CPUs / workers)")
+    ap.add_argument("--max-job-s", type=float, default=30.0, help="longest audio span decoded at once")
+    ap.add_argument("--pad-s", type=float, default=0.2, help="audio kept around each speech span")
+    ap.add_argument("--max-gap-s", type=float, default=1.0, help="join speech spans closer than this")
+    args = ap.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg_stt, stream_cfg = cfg["stt"], cfg["streaming"]
+
+    paths = find_wavs(args.inputs)
+    if not paths:
+        print("[WARN] No WAV files found.")
+        return
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, cpus // workers)
+    audio_s = sum(_wav_seconds(p) for p in paths)
+    print(f"[INFO] {len(paths)} files, {audio_s / 60:.1f} min of audio; "
+          f"{workers} workers x {threads} threads, model '{cfg_stt['model']}'")
+
+    writer = OrderedWriter(paths)
+    jobs = plan_jobs(paths, stream_cfg, args.max_job_s, args.pad_s, args.max_gap_s)
+    speech_s = 0.0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cfg_stt, threads)) as pool:
+        in_flight = {}
+        exhausted = False
+        try:
+            while in_flight or not exhausted:
+                # keep a couple of jobs per worker queued, no more
+                while not exhausted and len(in_flight) < 2 * workers:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    fi, ji, path, start, end = job
+                    if start < 0:
+                        writer.end_of_file(fi, ji)
+                        continue
+                    speech_s += end - start
+                    in_flight[pool.submit(_transcribe_job, path, start, end)] = (fi, ji)
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fi, ji = in_flight.pop(fut)
+                    try:
+                        segments = fut.result()
+                    except Exception as e:
+                        print(f"[ERROR] {paths[fi]} job {ji} failed: {e}")
+                        segments = []
+                    writer.add(fi, ji, segments)
+        finally:
+            writer.close()
+
+    wall = time.perf_counter() - t0
+    print(f"[STATS] {writer.done_files}/{len(paths)} files in {wall:.1f} s: "
+          f"{audio_s / wall:.1f}x real time over all audio, {speech_s / wall:.1f}x over "
+          f"the {speech_s / 60:.1f} min of speech actually decoded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# tools/bench_intent.py
+"""
+Regression check and timing for core/intent.py against the substring scans
+it replaced (classify_question_intent / _classify_behavior_tags, formerly in
+core/answer_llm.py and copied in core/projects.py).
+
+The corpus is the questions of an answer bank (if one exists), a set of
+typical interview questions, and random sentences stitched together from
+the rule literals and filler words, so every rule and rule order gets
+exercised, including matches inside other words ("dr" in "address").
+Every question must get the same intent and the same tags, in the same
+order.
+
+    python tools/bench_intent.py
+    python tools/bench_intent.py --bank data/answer_bank.jsonl --random 50000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.intent import IntentClassifier, INTENT_RULES, TAG_RULES, FALLBACK_TAG_RULE
+
+SAMPLE_QUESTIONS = [
+    "Tell me about yourself.",
+    "What have you studied and what is your background?",
+    "What has been your experience with Kubernetes?",
+    "What are your greatest strengths?",
+    "What is your biggest weakness?",
+    "What is an LLM and how do LLMs work?",
+    "Walk me through an end to end pipeline you built for ML.",
+    "Why do you want to work here?",
+    "Tell me about a time you missed a deadline.",
+    "Describe a situation where you led a team through an outage.",
+    "Can you talk about a specific project you worked on with MLOps?",
+    "How did you handle a production incident at your last company?",
+    "How would you reduce the cost of training models?",
+    "How do you address security and compliance audits?",
+    "Give me an example of a real-time sensor data project.",
+    "What does your typical day look like?",
+]
+
+FILLERS = ["so", "um", "can you", "tell me", "your", "about", "the", "how", "we", "address",
+           "drove", "time", "project", "again", "well", "led", "model", "and", "a", "in"]
+
+
+def legacy_classify(q: str):
+    return legacy_intent(q), legacy_behavior_tags(q)
+
+
+def legacy_intent(q: str) -> str:
+    q = q.lower().strip()
+
+    if any(p in q for p in ["tell me about yourself", "introduce yourself", "who are you"]):
+        return "intro"
+
+    if "what have you studied" in q or "education" in q or "background" in q:
+        return "education"
+
+    if "experience" in q and "what has been your" in q:
+        return "experience"
+
+    if "strength" in q:
+        return "strengths"
+
+    if "weakness" in q or "development areas" in q or "improvement areas" in q:
+        return "weaknesses"
+
+    # LLM basics
+    if any(p in q for p in [
+        "what is an llm",
+        "what is a large language model",
+        "how do llms work",
+        "generative ai",
+        "foundation model",
+        "what is gpt",
+        "what are transformers",
+    ]):
+        return "llm_basics"
+
+    # ML pipeline / productionization
+    if any(p in q for p in [
+        "ml pipeline",
+        "machine learning pipeline",
+        "end to end pipeline",
+        "end-to-end pipeline",
+        "ml workflow",
+        "machine learning workflow",
+        "productionize",
+        "productionalize",
+        "deploy a model",
+        "model deployment steps",
+        "model training pipeline",
+        "feature pipeline",
+    ]):
+        return "ml_pipeline"
+
+    why_patterns = [
+        "why do you want to work here",
+        "why do you want to work for",
+        "why are you interviewing with me today",
+        "why are you interviewing with us",
+        "what made you apply for this job",
+        "what made you apply",
+        "why this job",
+        "why this company",
+        "why do you want to join",
+        "why do you want this role",
+        "why are you interested in this position",
+        "why should we hire you",
+        "why should we give this job to you",
+        "why should we hire you and not someone else",
+    ]
+    if any(p in q for p in why_patterns):
+        return "why_company"
+
+    # Behavioral / STAR-style project questions
+    behavioral_patterns = [
+        "tell me about a time",
+        "give me an example",
+        "describe a time",
+        "describe a situation",
+        "situation where",
+        "project where",
+        "project when",
+        "time when you",
+        "time when you were",
+        "handled a",
+        "faced a",
+        "dealt with",
+        "how did you handle",
+        "how did you meet the deadline",
+        "with a deadline",
+        "in charge of a project",
+    ]
+
+    if any(p in q for p in behavioral_patterns):
+        return "behavioral_project"
+
+    # Generic “tell me about a project” → treat as behavioral_project
+    if "project" in q and any(p in q for p in [
+        "end-to-end",
+        "end to end",
+        "mlops",
+        "devops",
+        "specific project you worked on",
+        "project you worked on",
+        "end-to-end mlops",
+        "end-to-end devops",
+        "devops project",
+        "mlops project",
+        "devops project you worked on",
+        "mlops project you worked on",
+        "devops pipeline you worked on",
+        "mlops pipeline you worked on",
+    ]):
+        return "behavioral_project"
+
+    return "generic"
+
+
+def legacy_behavior_tags(question: str):
+    q = question.lower()
+    tags = []
+
+    # DEADLINE / PRESSURE / OWNERSHIP
+    if any(w in q for w in ["deadline", "time pressure", "tight schedule", "deliver on time"]):
+        tags.append("deadline")
+    if any(w in q for w in ["in charge", "led", "leadership", "owned", "owner", "drove"]):
+        tags.append("leadership")
+        tags.append("ownership")
+
+    # COST / OPTIMIZATION / EFFICIENCY
+    if any(w in q for w in ["cost", "budget", "optimiz", "expense", "saving", "save money"]):
+        tags.append("cost")
+        tags.append("analysis")
+
+    # RELIABILITY / INCIDENT / DR
+    if any(w in q for w in ["incident", "outage", "downtime", "reliability", "dr", "disaster"]):
+        tags.append("incident")
+        tags.append("reliability")
+        tags.append("risk")
+
+    # COMPLIANCE / SECURITY
+    if any(w in q for w in ["compliance", "audit", "soc2", "security", "controls", "governance"]):
+        tags.append("compliance")
+        tags.append("audit")
+        tags.append("security")
+
+    # MLOps / DATA / REALTIME
+    if any(w in q for w in ["mlops", "model", "training", "deploying models", "prediction"]):
+        tags.append("mlops")
+    if any(w in q for w in ["real-time", "realtime", "stream", "sensor", "modbus", "iot"]):
+        tags.append("realtime")
+        tags.append("sensor_data")
+    if any(w in q for w in ["pipeline", "data", "ingestion", "processing"]):
+        tags.append("data_ingestion")
+        tags.append("data_processing")
+
+    # FALLBACK: generic behavioral project
+    if not tags and any(w in q for w in ["project", "situation", "example", "experience"]):
+        tags.append("ownership")
+        tags.append("deadline")
+
+    # Deduplicate, keep order
+    seen = set()
+    deduped = []
+    for t in tags:
+        if t not in seen:
+            seen.add(t)
+            deduped.append(t)
+    return deduped
+
+
+
+def _literals() -> List[str]:
+    lits = set()
+    for _, groups in INTENT_RULES + [(t, g) for t, g in TAG_RULES] + [FALLBACK_TAG_RULE]:
+        for group in groups:
+            lits.update(group)
+    return sorted(lits)
+
+
+def random_questions(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    lits = _literals()
+    out = []
+    for _ in range(n):
+        words = [rng.choice(lits) if rng.random() < 0.3 else rng.choice(FILLERS)
+                 for _ in range(rng.randint(1, 12))]
+        s = " ".join(words)
+        if rng.random() < 0.3:
+            s = s.upper() if rng.random() < 0.5 else s.title()
+        if rng.random() < 0.3:
+            s = s.replace(" ", "", 1)  # glue two words
+        out.append(s + rng.choice(["", "?", ".", " "]))
+    return out
+
+
+def load_bank(path: str) -> List[str]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line).get("question", "") for line in f if line.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bank", default=os.path.join("data", "answer_bank.jsonl"), help="answer bank JSONL")
+    ap.add_argument("--random", type=int, default=20000, help="number of random stitched questions")
+    args = ap.parse_args()
+
+    bank = load_bank(args.bank)
+    corpus = bank + SAMPLE_QUESTIONS + random_questions(args.random)
+    print(f"[INFO] {len(corpus)} questions ({len(bank)} from the answer bank)")
+
+    clf = IntentClassifier()
+    t0 = time.perf_counter()
+    expected = [legacy_classify(q) for q in corpus]
+    t_old = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = [clf.classify(q) for q in corpus]
+    t_new = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = clf.classify_many(corpus)
+    t_batch = time.perf_counter() - t0
+
+    diff = [(q, a, b) for q, a, b in zip(corpus, expected, got) if a != b]
+    if diff or batch != got:
+        print(f"[ERROR] {len(diff)} of {len(corpus)} questions classified differently")
+        for q, a, b in diff[:5]:
+            print(f"  {q!r}: legacy {a}, compiled {b}")
+        if batch != got:
+            print("[ERROR] classify_many() differs from classify()")
+    else:
+        print(f"[INFO] Identical intent and tags for all {len(corpus)} questions")
+
+    per_q = lambda t: t / len(corpus) * 1e6
+    print(f"substring scans : {per_q(t_old):6.1f} us/question")
+    print(f"compiled        : {per_q(t_new):6.1f} us/question ({t_old / t_new:.1f}x)")
+    print(f"classify_many() : {per_q(t_batch):6.1f} us/question")
+
+
+if __name__ == "__main__":
+    main()
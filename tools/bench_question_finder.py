@@ -0,0 +1,283 @@
+# tools/bench_question_finder.py
+"""
+Replay a transcript through QuestionFinder and compare it with the old
+implementation, which re-split and re-judged its whole 4000-char rolling
+buffer on every call.
+
+Checks that both emit the same questions, then times the average cost of a
+call for a range of buffer sizes; the current finder should stay flat.
+Every sentence of the transcript then goes through both pattern matchers
+(_looks_like_question and _normalize_question) to compare results and cost,
+and the seen-question dedupe check is timed against the old linear scan.
+
+The output check gives the old finder a buffer that holds the whole
+transcript. With its usual 4000 chars it also judged whatever fragment of a
+sentence had been cut off at the head of the buffer, which emitted partial
+"questions" such as "was owned by another team."; those are reported
+separately.
+
+    python tools/bench_question_finder.py
+    python tools/bench_question_finder.py --transcript recordings/mock_01.txt --buffers 1000,4000,16000
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.dedupe import DedupeIndex
+from core.question_finder import QuestionFinder, QUESTION_WORDS, QUESTION_PHRASES, LEADING_FILLERS, IGNORED_PATTERNS
+
+# batch_transcribe.py / stt_whisper.py line prefix: "[12.34 s → 15.67 s] "
+_TIMESTAMP = re.compile(r"^\[[\d.]+ s → [\d.]+ s\]\s*")
+
+
+class LegacyQuestionFinder(QuestionFinder):
+    """
+    The QuestionFinder from before sentences were finalized once (rolling-buffer
+    process()) and before the pattern tables were compiled (one re.search /
+    re.sub per pattern).
+    """
+
+    def __init__(self, buffer_limit: int = 4000):
+        super().__init__(buffer_limit)
+        self.text_tail = ""
+
+    def process(self, new_text: str) -> List[str]:
+        if not new_text:
+            return []
+        self.text_tail += " " + new_text
+        if len(self.text_tail) > self.buffer_limit:
+            self.text_tail = self.text_tail[-self.buffer_limit:]
+        return [cand for cand in self._split_sentences(self.text_tail) if self._accept(cand)]
+
+    def _normalize_question(self, s: str) -> str:
+        s = s.strip()
+
+        # remove trailing punctuation
+        s = re.sub(r"[?!.\s]+$", "", s)
+        s = s.lower()
+
+        # strip common boilerplate
+        boilerplate_patterns = [
+            r"^so\s+let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
+            r"^so\s+let'?s\s+begin\s+with\s+our\s+first\s+question\s+which\s+is\s+",
+            r"^let'?s\s+begin\s+with\s+our\s+very\s+first\s+question\s+which\s+is\s+",
+            r"^let'?s\s+start\s+with\s+the\s+tell\s+me\s+about\s+yourself\s+question\s*",
+        ]
+        for pat in boilerplate_patterns:
+            s = re.sub(pat, "", s)
+
+        # strip leading fillers like "so", "okay", etc.
+        for filler in LEADING_FILLERS:
+            pattern = r"^" + re.escape(filler) + r"[\s,]+"
+            s = re.sub(pattern, "", s)
+
+        # collapse repeated filler tokens and repeated words
+        s = re.sub(r'\b(\w+)( \1){2,}\b', r'\1', s)
+
+        # keep from the first question word onwards
+        tokens = s.split()
+        if not tokens:
+            return ""
+        first_q_idx = None
+        for i, t in enumerate(tokens):
+            if t in QUESTION_WORDS:
+                first_q_idx = i
+                break
+        if first_q_idx is not None:
+            tokens = tokens[first_q_idx:]
+        s = " ".join(tokens)
+
+        # collapse whitespace
+        s = re.sub(r"\s+", " ", s)
+        return s.strip()
+
+    def _looks_like_question(self, s: str) -> bool:
+        if not s:
+            return False
+
+        raw = s.strip()
+        lower = raw.lower()
+
+        # ignore obvious meeting chatter / commands
+        for pat in IGNORED_PATTERNS:
+            if re.search(pat, lower):
+                return False
+
+        # explicit '?'
+        if "?" in raw:
+            return True
+
+        # interrogative phrases
+        for phrase in QUESTION_PHRASES:
+            if phrase in lower:
+                return True
+
+        # first token heuristic
+        tokens = lower.split()
+        if not tokens:
+            return False
+
+        first = tokens[0]
+        if first in QUESTION_WORDS:
+            # require at least a verb or a question word + noun to avoid short fragments
+            if len(tokens) >= 5:
+                return True
+            # short questions like "Can you explain X?" are OK if they contain a verb after the first token
+            if len(tokens) >= 3 and any(t in tokens for t in ["explain", "describe", "show", "tell", "walk", "do", "did", "have", "has"]):
+                return True
+
+        # filter explanatory "X is Y, right?" with no 'you/your' (likely not an interview question)
+        if lower.endswith(" right") and "you" not in tokens and "your" not in tokens:
+            return False
+
+        return False
+
+
+def synthetic_transcript(n_sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    subjects = ["the data pipeline", "your last project", "model monitoring", "the feature store",
+                "a production incident", "CI for models", "the training cluster", "drift detection"]
+    questions = [
+        "can you tell me about {s}?",
+        "so how did you handle {s} at your previous company?",
+        "walk me through {s} and what you would change",
+        "what did you do when {s} broke in production?",
+        "okay so could you give me an example of {s}",
+        "so let's begin with our very first question which is how do you monitor {s}?",
+        "um, so, what what what would you do if {s} fell over",
+    ]
+    statements = [
+        "we used {s} for about two years.",
+        "that makes sense, thanks.",
+        "right, {s} is the main thing we care about here.",
+        "you are on mute, give me a minute.",
+        "um so yeah, {s} was owned by another team.",
+        "I see.",
+    ]
+    out = []
+    for i in range(n_sentences):
+        pool = questions if rng.random() < 0.3 else statements
+        # vary the subject so later questions are not all duplicates
+        s = f"{rng.choice(subjects)} number {i % 97}"
+        out.append(rng.choice(pool).format(s=s))
+    return " ".join(out)
+
+
+def load_transcript(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return " ".join(_TIMESTAMP.sub("", line).strip() for line in f if line.strip())
+
+
+def chunk_words(text: str, words_per_chunk: int) -> List[str]:
+    words = text.split()
+    return [" ".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+
+def replay(finder: QuestionFinder, chunks: List[str]):
+    found = []
+    t0 = time.perf_counter()
+    for c in chunks:
+        found += finder.process(c)
+    return found, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transcript", help="text file to replay (default: synthetic interview transcript)")
+    ap.add_argument("--sentences", type=int, default=500, help="synthetic transcript length")
+    ap.add_argument("--chunk-words", type=int, default=8, help="words per STT chunk")
+    ap.add_argument("--buffers", default="1000,4000,16000", help="comma list of buffer_limit values")
+    ap.add_argument("--seen", default="100,1000,10000", help="comma list of stored-question counts for the dedupe check")
+    args = ap.parse_args()
+
+    text = load_transcript(args.transcript) if args.transcript else synthetic_transcript(args.sentences)
+    chunks = chunk_words(text, args.chunk_words)
+    print(f"[INFO] {len(text.split())} words in {len(chunks)} chunks")
+
+    new_q, _ = replay(QuestionFinder(), chunks)
+    legacy_q, _ = replay(LegacyQuestionFinder(buffer_limit=len(text) + 1), chunks)
+    if legacy_q == new_q:
+        print(f"[INFO] Outputs match: {len(new_q)} questions")
+    else:
+        print(f"[ERROR] Outputs differ: legacy {len(legacy_q)}, current {len(new_q)} questions")
+        for q in [q for q in legacy_q if q not in new_q][:5]:
+            print(f"  legacy only : {q}")
+        for q in [q for q in new_q if q not in legacy_q][:5]:
+            print(f"  current only: {q}")
+
+    truncated_q, _ = replay(LegacyQuestionFinder(), chunks)
+    fragments = [q for q in truncated_q if q not in new_q]
+    if fragments:
+        print(f"[INFO] Legacy finder with its 4000-char buffer also emitted {len(fragments)} head-of-buffer "
+              f"fragments, e.g. {fragments[0]!r}")
+
+    print(f"{'buffer_limit':>12s} {'legacy us/call':>15s} {'current us/call':>16s} {'speedup':>8s}")
+    for limit in [int(x) for x in args.buffers.split(",") if x.strip()]:
+        _, t_old = replay(LegacyQuestionFinder(limit), chunks)
+        _, t_new = replay(QuestionFinder(limit), chunks)
+        per_call = lambda t: t / len(chunks) * 1e6
+        print(f"{limit:12d} {per_call(t_old):15.1f} {per_call(t_new):16.1f} {t_old / t_new:7.1f}x")
+
+    bench_matchers(QuestionFinder()._split_sentences(text))
+    bench_dedupe(args.seen)
+
+
+def _judge(finder: QuestionFinder, sentences: List[str]):
+    t0 = time.perf_counter()
+    out = [(finder._looks_like_question(s), finder._normalize_question(s)) for s in sentences]
+    return out, time.perf_counter() - t0
+
+
+def bench_matchers(sentences: List[str]) -> None:
+    legacy_out, t_old = _judge(LegacyQuestionFinder(), sentences)
+    new_out, t_new = _judge(QuestionFinder(), sentences)
+    diff = [s for s, a, b in zip(sentences, legacy_out, new_out) if a != b]
+    if diff:
+        print(f"[ERROR] Pattern matchers disagree on {len(diff)} of {len(sentences)} sentences, "
+              f"e.g. {diff[0]!r}")
+    else:
+        print(f"[INFO] Pattern matchers agree on all {len(sentences)} sentences")
+    per_sentence = lambda t: t / max(len(sentences), 1) * 1e6
+    print(f"per-pattern re calls: {per_sentence(t_old):7.1f} us/sentence")
+    print(f"compiled tables     : {per_sentence(t_new):7.1f} us/sentence ({t_old / t_new:.1f}x)")
+
+
+
+def _random_question(rng: random.Random) -> str:
+    words = ["how", "did", "you", "handle", "the", "pipeline", "deploy", "model", "drift", "incident",
+             "team", "latency", "budget", "cluster", "feature", "store", "alerts", "rollback", "tests"]
+    return " ".join(rng.choice(words) for _ in range(rng.randint(6, 14))) + f" {rng.randint(0, 10**6)}"
+
+
+def bench_dedupe(counts: str, queries: int = 500) -> None:
+    rng = random.Random(1)
+    print(f"{'seen':>8s} {'linear us/check':>16s} {'index us/check':>15s}")
+    for n in [int(x) for x in counts.split(",") if x.strip()]:
+        stored = [_random_question(rng) for _ in range(n)]
+        probes = [_random_question(rng) for _ in range(queries)]
+        probes += [rng.choice(stored)[5:-3] for _ in range(queries)]  # contained in an entry
+
+        index = DedupeIndex(capacity=n)
+        for s in stored:
+            index.add(s)
+
+        t0 = time.perf_counter()
+        linear = [any(q in s or s in q for s in stored) for q in probes]
+        t_lin = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        indexed = [index.contains(q) for q in probes]
+        t_idx = time.perf_counter() - t0
+        if linear != indexed:
+            print(f"[ERROR] DedupeIndex disagrees with the linear scan at {n} entries")
+        per = lambda t: t / len(probes) * 1e6
+        print(f"{n:8d} {per(t_lin):16.1f} {per(t_idx):15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# tools/bench_ring_buffer.py
+"""
+Micro-benchmark: growing/shrinking np.concatenate buffer (old main.py loop)
+vs. the preallocated AudioRingBuffer.
+
+    python tools/bench_ring_buffer.py --seconds 120
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ring_buffer import AudioRingBuffer
+
+
+def _chunks(rate: int, channels: int, chunk_ms: int, seconds: int):
+    n = int(rate * chunk_ms / 1000) * channels
+    rng = np.random.default_rng(0)
+    chunk = rng.integers(-3000, 3000, size=n, dtype=np.int16)
+    return [chunk] * int(seconds * 1000 / chunk_ms)
+
+
+def bench_concatenate(chunks, window: int, step: int) -> tuple:
+    buffer = np.array([], dtype=np.int16)
+    windows = 0
+    checksum = 0
+    t0 = time.perf_counter()
+    for c in chunks:
+        buffer = np.concatenate((buffer, c))
+        if buffer.size >= window:
+            w = buffer[:window]
+            checksum += int(w[0]) + int(w[-1])
+            windows += 1
+            buffer = buffer[step:]
+    return time.perf_counter() - t0, windows, checksum
+
+
+def bench_ring(chunks, window: int, step: int) -> tuple:
+    ring = AudioRingBuffer(capacity=2 * window)
+    windows = 0
+    checksum = 0
+    t0 = time.perf_counter()
+    for c in chunks:
+        ring.write(c)
+        if ring.available() >= window:
+            w = ring.window(window)
+            checksum += int(w[0]) + int(w[-1])
+            windows += 1
+            ring.advance(step)
+    return time.perf_counter() - t0, windows, checksum
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rate", type=int, default=48000)
+    ap.add_argument("--channels", type=int, default=2)
+    ap.add_argument("--chunk-ms", type=int, default=20)
+    ap.add_argument("--window-s", type=int, default=10)
+    ap.add_argument("--step-s", type=int, default=3)
+    ap.add_argument("--seconds", type=int, default=120, help="simulated audio length")
+    args = ap.parse_args()
+
+    # same sample arithmetic as main.py
+    window = args.rate * args.window_s
+    step = args.rate * args.step_s
+    chunks = _chunks(args.rate, args.channels, args.chunk_ms, args.seconds)
+
+    t_cat, n_cat, sum_cat = bench_concatenate(chunks, window, step)
+    t_ring, n_ring, sum_ring = bench_ring(chunks, window, step)
+    assert (n_cat, sum_cat) == (n_ring, sum_ring), "ring buffer produced different windows"
+
+    per_chunk = lambda t: t / len(chunks) * 1e6
+    print(f"[INFO] {len(chunks)} chunks, {n_cat} windows")
+    print(f"concatenate/slice : {t_cat * 1000:8.1f} ms total, {per_chunk(t_cat):7.2f} us/chunk")
+    print(f"AudioRingBuffer   : {t_ring * 1000:8.1f} ms total, {per_chunk(t_ring):7.2f} us/chunk")
+    print(f"speedup           : {t_cat / t_ring:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,41 @@
 # tools/build_answer_bank.py
+"""
+Collect the Q&A pairs of past sessions (data/sessions/*/qa_log.md) into the
+answer bank, data/answer_bank.jsonl, and rebuild its retrieval index.
 
+Builds are incremental: a manifest next to the bank records each session
+log's size, mtime and sha256, and only new or changed logs are parsed
+(across a process pool when there are many). Their pairs are appended to
+the bank, skipping pairs already in it (same question, ignoring case,
+spacing and trailing punctuation, with the same bullets). If a log that
+was already collected changed or disappeared, the bank is rebuilt from all
+logs. --full re-parses everything and rewrites the bank. Answers that
+AnswerEngine appended to the bank during a session (answers.write_through)
+are kept either way.
+
+    python tools/build_answer_bank.py
+    python tools/build_answer_bank.py --full --workers 8
+"""
 import os
+import re
+import sys
 import glob
 import json
-from typing import List, Dict
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.answer_retriever import build_index, index_dir_for
+
+MANIFEST_VERSION = 1
+# below this many logs to parse, a process pool costs more than it saves
+POOL_MIN_FILES = 8
+
+_WHITESPACE = re.compile(r"\s+")
 
 
 def parse_qa_markdown(path: str) -> List[Dict]:
@@ -17,10 +49,13 @@ def parse_qa_markdown(path: str) -> List[Dict]:
 
     ---
     """
-    qa_pairs: List[Dict] = []
-
     with open(path, "r", encoding="utf-8") as f:
-        lines = [ln.rstrip("\n") for ln in f]
+        return parse_qa_lines([ln.rstrip("\n") for ln in f], path)
+
+
+def parse_qa_lines(lines: List[str], path: str) -> List[Dict]:
+    """Q&A pairs of one qa_log.md, given as lines (see parse_qa_markdown)."""
+    qa_pairs: List[Dict] = []
 
     current_q = None
     current_bullets: List[str] = []
@@ -79,23 +114,194 @@ def parse_qa_markdown(path: str) -> List[Dict]:
     return qa_pairs
 
 
-base_dir = os.path.join("data", "sessions")
-pattern = os.path.join(base_dir, "*", "qa_log.md")
-paths = glob.glob(pattern)
+def scan_session(path: str) -> Tuple[str, str, List[Dict]]:
+    """(path, sha256 of the file, Q&A pairs) for one session log; runs in pool workers."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    lines = raw.decode("utf-8").splitlines()
+    return path, hashlib.sha256(raw).hexdigest(), parse_qa_lines(lines, path)
+
+
+def pair_key(qa: Dict) -> str:
+    """Dedupe key: normalized question + bullets."""
+    q = _WHITESPACE.sub(" ", qa.get("question", "").lower()).strip().rstrip("?!. ")
+    bullets = "\n".join(b.strip() for b in qa.get("bullets", []))
+    return hashlib.sha1((q + "\0" + bullets).encode("utf-8")).hexdigest()
+
+
+def _stamp(path: str) -> Dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def manifest_path_for(out_path: str) -> str:
+    return os.path.splitext(out_path)[0] + ".manifest.json"
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def save_manifest(path: str, files: Dict, keys: Set[str], out_path: str) -> None:
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "bank_size": os.path.getsize(out_path) if os.path.exists(out_path) else 0,
+        "files": files,
+        "keys": sorted(keys),
+    }
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def read_bank_keys(out_path: str, start: int = 0, live_only: bool = False) -> Tuple[List[str], Set[str]]:
+    """
+    Lines of the current bank (from byte `start` on) and their dedupe keys.
+    With `live_only`, only pairs AnswerEngine appended during a session
+    (they have no source_file).
+    """
+    lines: List[str] = []
+    keys: Set[str] = set()
+    if not os.path.exists(out_path):
+        return lines, keys
+    with open(out_path, "rb") as f:
+        f.seek(start)
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace")
+            if not line.strip():
+                continue
+            try:
+                qa = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(qa, dict) or (live_only and "source_file" in qa):
+                continue
+            lines.append(line if line.endswith("\n") else line + "\n")
+            keys.add(pair_key(qa))
+    return lines, keys
+
+
+def _ends_with_newline(path: str, size: int) -> bool:
+    """Whether the first `size` bytes of `path` end a line (so what follows are whole appended lines)."""
+    if size == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def scan_all(paths: List[str], workers: int) -> List[Tuple[str, str, List[Dict]]]:
+    if workers > 1 and len(paths) >= POOL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(scan_session, paths, chunksize=max(1, len(paths) // (4 * workers))))
+    return [scan_session(p) for p in paths]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", default=os.path.join("data", "sessions"), help="session logs directory")
+    ap.add_argument("--out", default=os.path.join("data", "answer_bank.jsonl"), help="answer bank JSONL")
+    ap.add_argument("--full", action="store_true", help="re-parse every session log and rewrite the bank")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    args = ap.parse_args(argv)
+
+    t_start = time.perf_counter()
+    out_path = args.out
+    manifest_path = manifest_path_for(out_path)
+    paths = sorted(glob.glob(os.path.join(args.sessions, "*", "qa_log.md")))
+    print(f"[INFO] Found {len(paths)} qa_log.md files")
+
+    manifest = None if args.full else load_manifest(manifest_path)
+    if manifest is None and not args.full and os.path.exists(out_path):
+        print(f"[INFO] No usable manifest at {manifest_path}, rebuilding the bank from all sessions")
+    full = manifest is None
+    known: Dict = {} if full else manifest["files"]
+
+    # only logs whose size/mtime changed are read; a changed stamp with the same hash is just re-stamped
+    stamps = {p: _stamp(p) for p in paths}
+    candidates = [p for p in paths
+                  if {k: known.get(p, {}).get(k) for k in ("size", "mtime_ns")} != stamps[p]]
+    scanned = scan_all(candidates, args.workers)
+
+    files = {p: known[p] for p in paths if p in known}
+    parsed: Dict[str, List[Dict]] = {}
+    for p, digest, pairs in scanned:
+        if known.get(p, {}).get("sha256") == digest:
+            files[p].update(stamps[p])
+            continue
+        files[p] = dict(stamps[p], sha256=digest, pairs=len(pairs))
+        parsed[p] = pairs
+        print(f"[INFO] Parsed {len(pairs)} Q&A pairs from {p}")
+
+    # a collected log that changed or disappeared: its pairs may also stand in for
+    # duplicates skipped in other logs, so the bank is rebuilt from every log
+    stale = [p for p in known if p not in stamps or p in parsed]
+    if stale and not full:
+        print(f"[INFO] {len(stale)} collected session logs changed or were removed, rebuilding the bank from all sessions")
+        full = True
+        for p, digest, pairs in scan_all([p for p in paths if p not in parsed], args.workers):
+            files[p] = dict(stamps[p], sha256=digest, pairs=len(pairs))
+            parsed[p] = pairs
+
+    bank_size = os.path.getsize(out_path) if os.path.exists(out_path) else 0
+    known_size = (manifest or {}).get("bank_size", -1)
+    grown = False
+    if full:
+        # answers appended live by AnswerEngine are kept: their session log may never have been written
+        kept, keys = read_bank_keys(out_path, live_only=True)
+        mode = "w"
+    elif bank_size == known_size:
+        kept, keys, mode = [], set(manifest.get("keys", [])), "a"
+    elif 0 <= known_size < bank_size and _ends_with_newline(out_path, known_size):
+        # answers appended live since the last run: only those lines need reading
+        _, tail_keys = read_bank_keys(out_path, start=known_size)
+        kept, keys, mode = [], set(manifest.get("keys", [])) | tail_keys, "a"
+        grown = True
+    else:
+        # bank written without its manifest (interrupted run / edited by hand): re-read its keys
+        kept, keys = read_bank_keys(out_path)
+        mode = "w"
+
+    added = duplicates = 0
+    new_lines: List[str] = []
+    for p in paths:
+        for qa in parsed.get(p, ()):
+            key = pair_key(qa)
+            if key in keys:
+                duplicates += 1
+                continue
+            keys.add(key)
+            new_lines.append(json.dumps(qa, ensure_ascii=False) + "\n")
+            added += 1
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    if mode == "w":
+        with open(out_path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(kept + new_lines)
+        os.replace(out_path + ".tmp", out_path)
+    elif new_lines:
+        with open(out_path, "a", encoding="utf-8") as f:
+            f.writelines(new_lines)
+    save_manifest(manifest_path, files, keys, out_path)
 
-all_pairs: List[Dict] = []
-print(f"[INFO] Found {len(paths)} qa_log.md files")
-for p in sorted(paths):
-    parsed = parse_qa_markdown(p)        # pairs for this file
-    all_pairs.extend(parsed)
-    # print per-file and cumulative counts
-    print(f"[INFO] Parsed {len(parsed)} Q&A pairs from {p} (cumulative: {len(all_pairs)})")
-out_path = os.path.join("data", "answer_bank.jsonl")
-os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    print(f"[INFO] {len(parsed)} session logs parsed, {len(paths) - len(parsed)} unchanged; "
+          f"added {added} Q&A pairs to {out_path} ({duplicates} duplicates skipped, "
+          f"{len(keys)} in the bank)")
 
-with open(out_path, "w", encoding="utf-8") as f:
-    for qa in all_pairs:
-        f.write(json.dumps(qa, ensure_ascii=False) + "\n")
+    # memory-mapped retrieval index next to the JSONL, so AnswerEngine doesn't re-parse it on start
+    if mode == "w" or new_lines or grown or not os.path.exists(os.path.join(index_dir_for(out_path), "meta.json")):
+        t0 = time.perf_counter()
+        index_dir = build_index(out_path)
+        print(f"[INFO] Wrote answer bank index to {index_dir} in {time.perf_counter() - t0:.1f} s")
+    print(f"[INFO] Done in {time.perf_counter() - t_start:.1f} s")
 
-print(f"[INFO] Extracted {len(all_pairs)} Q&A pairs into {out_path}")
 
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ def write_session_transcript(qa_log: List[Dict], base_dir: str = "data/sessions"
 
     ## Q1. <question text>
 
+    _Same as earlier question: <earlier question>_   (only for near-duplicates)
+
     - bullet 1
     - bullet 2
 
@@ -32,6 +34,8 @@ def write_session_transcript(qa_log: List[Dict], base_dir: str = "data/sessions"
             bullets = item.get("bullets", []) or []
 
             f.write(f"## Q{i}. {q_text}\n\n")
+            if item.get("duplicate_of"):
+                f.write(f"_Same as earlier question: {item['duplicate_of'].strip()}_\n\n")
             for b in bullets:
                 b = str(b).strip()
                 if not b: